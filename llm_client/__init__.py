@@ -0,0 +1,32 @@
+"""
+Shared provider client used by q1, q2 and q3.
+
+Every Gemini or OpenAI call goes through one LLMClient per process, which
+applies per-call timeouts, per-model request and token rate limits,
+jittered retries of transient errors, coalescing of identical in-flight
+requests, and keeps per-model latency and error statistics.
+"""
+
+from .limits import RateLimited, RateLimiter, TokenBucket
+from .client import ClientConfig, LLMClient, ModelStats, is_retryable, request_key, shared_client
+from .adapters import GeminiModel, OpenAIChat, estimate_tokens, gemini_model, openai_client
+from .fake import FakeBackend, FakeProviderError
+
+__all__ = [
+    'RateLimited',
+    'RateLimiter',
+    'TokenBucket',
+    'ClientConfig',
+    'LLMClient',
+    'ModelStats',
+    'is_retryable',
+    'request_key',
+    'shared_client',
+    'GeminiModel',
+    'OpenAIChat',
+    'estimate_tokens',
+    'gemini_model',
+    'openai_client',
+    'FakeBackend',
+    'FakeProviderError'
+]
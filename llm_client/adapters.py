@@ -0,0 +1,147 @@
+"""Drop-in wrappers that route SDK calls through an LLMClient.
+
+GeminiModel mirrors genai.GenerativeModel.generate_content and OpenAIChat
+mirrors openai.OpenAI().chat.completions.create, so callers keep their code
+and gain rate limiting, retries, coalescing and stats. Anything else is
+passed through to the wrapped object.
+"""
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from .client import LLMClient, request_key, shared_client
+
+# Rough prompt cost for the token budget before the real usage is known
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 258
+
+
+def estimate_tokens(contents: Any) -> int:
+    """Estimate the prompt tokens of Gemini contents or OpenAI messages."""
+    if isinstance(contents, str):
+        return max(1, len(contents) // CHARS_PER_TOKEN)
+    if isinstance(contents, dict):
+        if "data" in contents:
+            return IMAGE_TOKENS
+        return estimate_tokens(contents.get("content") or contents.get("text") or contents.get("parts") or "")
+    if isinstance(contents, (list, tuple)):
+        return sum(estimate_tokens(part) for part in contents)
+    return IMAGE_TOKENS
+
+
+class _StreamResponse:
+    """Iterates the chunks of a streamed response while exposing its other attributes."""
+
+    def __init__(self, response, chunks):
+        self._response = response
+        self._chunks = chunks
+
+    def __iter__(self):
+        return self._chunks
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+def gemini_usage(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+
+def openai_usage(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+class GeminiModel:
+    """Wraps a genai.GenerativeModel (or a fake with the same generate_content)."""
+
+    def __init__(self, model, name: Optional[str] = None, client: Optional[LLMClient] = None,
+                 timeout: Optional[float] = None):
+        self.model = model
+        self.name = name or getattr(model, "model_name", type(model).__name__)
+        self.client = client or shared_client()
+        # Only real SDK models accept request_options
+        self.timeout = timeout
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        if self.timeout:
+            kwargs.setdefault("request_options", {"timeout": self.timeout})
+        tokens = estimate_tokens(contents)
+        if stream:
+            response, chunks = self.client.stream(
+                self.name, self.model.generate_content, contents, stream=True, tokens=tokens, **kwargs
+            )
+            return _StreamResponse(response, chunks)
+        return self.client.call(
+            self.name, self.model.generate_content, contents,
+            tokens=tokens, usage=gemini_usage,
+            key=request_key(self.name, contents, **kwargs), **kwargs,
+        )
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+class _Completions:
+    def __init__(self, completions, client: LLMClient):
+        self._completions = completions
+        self._client = client
+
+    def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        tokens = estimate_tokens(messages)
+        if stream:
+            response, chunks = self._client.stream(
+                model, self._completions.create, model=model, messages=messages, stream=True, tokens=tokens, **kwargs
+            )
+            return _StreamResponse(response, chunks)
+        return self._client.call(
+            model, self._completions.create, model=model, messages=messages,
+            tokens=tokens, usage=openai_usage,
+            key=request_key(model, messages, **kwargs), **kwargs,
+        )
+
+
+class OpenAIChat:
+    """Wraps an openai.OpenAI client (or a fake) so chat completions go through an LLMClient."""
+
+    def __init__(self, openai_client, client: Optional[LLMClient] = None):
+        self.openai_client = openai_client
+        self.client = client or shared_client()
+        self.chat = SimpleNamespace(completions=_Completions(openai_client.chat.completions, self.client))
+
+    def __getattr__(self, name):
+        return getattr(self.openai_client, name)
+
+
+def gemini_model(model_name: str, api_key: str, client: Optional[LLMClient] = None) -> GeminiModel:
+    """Configure the Gemini SDK and return a wrapped GenerativeModel.
+
+    The SDK keeps one transport per process, so every model built here
+    shares its connections.
+    """
+    import google.generativeai as genai
+
+    client = client or shared_client()
+    genai.configure(api_key=api_key)
+    return GeminiModel(genai.GenerativeModel(model_name), model_name, client, timeout=client.config.timeout)
+
+
+def openai_client(api_key: str, client: Optional[LLMClient] = None) -> OpenAIChat:
+    """Build an OpenAI client with a bounded keep-alive connection pool and return it wrapped.
+
+    The SDK's own retries are turned off so they don't multiply with ours.
+    """
+    import httpx
+    from openai import OpenAI
+
+    client = client or shared_client()
+    http_client = httpx.Client(
+        timeout=client.config.timeout,
+        limits=httpx.Limits(
+            max_connections=client.config.max_connections,
+            max_keepalive_connections=client.config.max_connections,
+        ),
+    )
+    return OpenAIChat(
+        OpenAI(api_key=api_key, timeout=client.config.timeout, max_retries=0, http_client=http_client), client
+    )
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from .limits import RateLimiter
+
+# HTTP statuses and SDK exception names worth another attempt: rate limits,
+# timeouts and transient server errors
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    # google.api_core
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "DeadlineExceeded",
+    "InternalServerError", "GatewayTimeout", "RetryError",
+    # openai
+    "RateLimitError", "APITimeoutError", "APIConnectionError",
+    # builtins and httpx
+    "TimeoutError", "ConnectionError", "ConnectTimeout", "ReadTimeout", "RemoteProtocolError",
+}
+
+
+def is_retryable(error: Exception) -> bool:
+    for name in ("status_code", "code", "status"):
+        value = getattr(error, name, None)
+        if isinstance(value, int) and value in RETRYABLE_STATUS:
+            return True
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+@dataclass
+class ClientConfig:
+    timeout: float = 60.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 20.0
+    requests_per_minute: float = 0
+    tokens_per_minute: float = 0
+    max_rate_wait: float = 60.0
+    max_connections: int = 20
+    coalesce: bool = True
+
+    @classmethod
+    def from_env(cls, prefix: str = "LLM_") -> "ClientConfig":
+        def env(name: str, default, kind=float):
+            value = os.getenv(prefix + name)
+            return kind(value) if value not in (None, "") else default
+
+        return cls(
+            timeout=env("TIMEOUT_SECONDS", cls.timeout),
+            max_retries=env("MAX_RETRIES", cls.max_retries, int),
+            backoff_base=env("BACKOFF_SECONDS", cls.backoff_base),
+            requests_per_minute=env("REQUESTS_PER_MINUTE", cls.requests_per_minute),
+            tokens_per_minute=env("TOKENS_PER_MINUTE", cls.tokens_per_minute),
+            max_rate_wait=env("MAX_RATE_WAIT_SECONDS", cls.max_rate_wait),
+            max_connections=env("MAX_CONNECTIONS", cls.max_connections, int),
+            coalesce=env("COALESCE", "1", str) != "0",
+        )
+
+
+@dataclass
+class ModelStats:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    coalesced: int = 0
+    rate_limit_wait: float = 0.0
+    tokens: int = 0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.errors / self.calls if self.calls else 0.0,
+            "retries": self.retries,
+            "coalesced": self.coalesced,
+            "rate_limit_wait_seconds": round(self.rate_limit_wait, 3),
+            "tokens": self.tokens,
+            "latency_p50": self.percentile(0.5),
+            "latency_p95": self.percentile(0.95),
+        }
+
+
+def _canonical(value: Any):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {"sha256": hashlib.sha256(value).hexdigest()}
+    if isinstance(value, dict):
+        return {str(key): _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    raise TypeError(f"can't key {type(value).__name__}")
+
+
+def request_key(model: str, *args, **kwargs) -> Optional[str]:
+    """Key identifying an identical request, or None if its arguments can't be keyed."""
+    try:
+        payload = json.dumps([model, _canonical(args), _canonical(kwargs)], sort_keys=True)
+    except TypeError:
+        return None
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class _Pending:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMClient:
+    """Shared policy for provider calls: rate limits, retries, coalescing and per-model stats.
+
+    Calls are blocking and meant to run on worker threads. The provider
+    SDK call itself is passed in, so the same client serves Gemini, OpenAI
+    and fake backends.
+    """
+
+    def __init__(self, config: Optional[ClientConfig] = None):
+        self.config = config or ClientConfig()
+        self._limiters: dict[str, RateLimiter] = {}
+        self._stats: dict[str, ModelStats] = {}
+        self._in_flight: dict[str, _Pending] = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, model: str) -> RateLimiter:
+        with self._lock:
+            if model not in self._limiters:
+                self._limiters[model] = RateLimiter(
+                    self.config.requests_per_minute, self.config.tokens_per_minute, self.config.max_rate_wait
+                )
+            return self._limiters[model]
+
+    def _model_stats(self, model: str) -> ModelStats:
+        with self._lock:
+            return self._stats.setdefault(model, ModelStats())
+
+    def stats(self) -> dict:
+        """Per-model call statistics."""
+        with self._lock:
+            return {model: stats.snapshot() for model, stats in self._stats.items()}
+
+    def total(self, name: str) -> float:
+        """Sum of one ModelStats field across models, e.g. for metrics gauges."""
+        with self._lock:
+            return sum(getattr(stats, name) for stats in self._stats.values())
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt` (from 0)."""
+        return random.uniform(0, min(self.config.backoff_max, self.config.backoff_base * 2 ** attempt))
+
+    def _attempt(self, model: str, fn: Callable, args, kwargs, tokens: int, usage: Optional[Callable]):
+        stats = self._model_stats(model)
+        limiter = self._limiter(model)
+        attempt = 0
+        while True:
+            waited = limiter.acquire(tokens)
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                with self._lock:
+                    stats.rate_limit_wait += waited
+                    stats.calls += 1
+                    stats.errors += 1
+                    stats.latencies.append(time.perf_counter() - start)
+                    retry = attempt < self.config.max_retries and is_retryable(e)
+                    if retry:
+                        stats.retries += 1
+                if not retry:
+                    raise
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            used = usage(result) if usage else None
+            limiter.settle(tokens, used)
+            with self._lock:
+                stats.rate_limit_wait += waited
+                stats.calls += 1
+                stats.tokens += used if used is not None else tokens
+                stats.latencies.append(time.perf_counter() - start)
+            return result
+
+    def call(
+        self,
+        model: str,
+        fn: Callable,
+        /,
+        *args,
+        tokens: int = 0,
+        usage: Optional[Callable[[Any], Optional[int]]] = None,
+        key: Optional[str] = None,
+        **kwargs,
+    ):
+        """Run `fn(*args, **kwargs)` for `model` under its rate limits, retrying transient errors.
+
+        `tokens` is the estimated cost charged up front and `usage(result)`
+        returns the real count so the budget can be corrected. Callers that
+        pass the same `key` while a call is running share its result instead
+        of making their own.
+        """
+        if key is None or not self.config.coalesce:
+            return self._attempt(model, fn, args, kwargs, tokens, usage)
+
+        with self._lock:
+            pending = self._in_flight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._in_flight[key] = _Pending()
+            else:
+                self._stats.setdefault(model, ModelStats()).coalesced += 1
+        if not leader:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        try:
+            pending.result = self._attempt(model, fn, args, kwargs, tokens, usage)
+            return pending.result
+        except BaseException as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            pending.done.set()
+
+    def stream(
+        self,
+        model: str,
+        fn: Callable,
+        /,
+        *args,
+        tokens: int = 0,
+        **kwargs,
+    ) -> tuple[Any, Iterator]:
+        """Start a streaming call and return (response, chunks).
+
+        The call and its first chunk are retried like `call`; once a chunk
+        has been delivered, later failures are raised to the caller.
+        """
+        first = []
+
+        def start():
+            response = fn(*args, **kwargs)
+            chunks = iter(response)
+            first[:] = [next(chunks, _END)]
+            return response, chunks
+
+        response, chunks = self._attempt(model, start, (), {}, tokens, None)
+
+        def iterate():
+            if first[0] is _END:
+                return
+            yield first[0]
+            yield from chunks
+
+        return response, iterate()
+
+
+_END = object()
+
+_default_client: Optional[LLMClient] = None
+_default_lock = threading.Lock()
+
+
+def shared_client() -> LLMClient:
+    """The process-wide client, configured from LLM_* environment variables on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = LLMClient(ClientConfig.from_env())
+        return _default_client
@@ -0,0 +1,65 @@
+"""Local fake provider backend for exercising LLMClient without network access.
+
+FakeBackend answers Gemini-style generate_content calls after a set delay
+and can fail the first few calls, or a random fraction, with errors shaped
+like a provider's 429 or 500 so retries and statistics can be tested.
+"""
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+
+class FakeProviderError(Exception):
+    """A simulated provider error; `status_code` decides whether it is retried."""
+
+    def __init__(self, message: str, status_code: int = 429):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class FakeBackend:
+    def __init__(
+        self,
+        latency_ms: float = 50,
+        fail_first: int = 0,
+        error_rate: float = 0.0,
+        status_code: int = 429,
+        reply: str = "Simulated answer to: {prompt}",
+        model_name: str = "fake-model",
+    ):
+        self.latency_ms = latency_ms
+        self.fail_first = fail_first
+        self.error_rate = error_rate
+        self.status_code = status_code
+        self.reply = reply
+        self.model_name = model_name
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _prompt(self, contents) -> str:
+        if isinstance(contents, str):
+            return contents
+        return " ".join(part for part in contents if isinstance(part, str))
+
+    def _maybe_fail(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call <= self.fail_first or random.random() < self.error_rate:
+            raise FakeProviderError(f"Simulated error {self.status_code}", self.status_code)
+
+    def generate_content(self, contents, stream: bool = False, request_options: Optional[dict] = None, **kwargs):
+        time.sleep(self.latency_ms / 1000)
+        self._maybe_fail()
+        prompt = self._prompt(contents)
+        text = self.reply.format(prompt=prompt)
+        usage = SimpleNamespace(
+            prompt_token_count=len(prompt.split()),
+            candidates_token_count=len(text.split()),
+            total_token_count=len(prompt.split()) + len(text.split()),
+        )
+        if stream:
+            return iter([SimpleNamespace(text=word + " ") for word in text.split()])
+        return SimpleNamespace(text=text, usage_metadata=usage)
@@ -0,0 +1,80 @@
+import threading
+import time
+from typing import Optional
+
+
+class RateLimited(Exception):
+    """A call would have waited longer than allowed for rate-limit budget."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over a minute, holding at most `burst`.
+
+    Charges may push the balance below zero (e.g. when a response used more
+    tokens than estimated); later callers then wait until it recovers.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` now and return how long the caller must wait before using it."""
+        # A single request larger than the bucket would otherwise never fit
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._level -= amount
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def refund(self, amount: float):
+        """Give back (or, with a negative amount, additionally charge) `amount`."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._level = min(self.capacity, self._level + amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets for one model. A limit of 0 disables it."""
+
+    def __init__(self, requests_per_minute: float = 0, tokens_per_minute: float = 0, max_wait: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_wait = max_wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Block until a request with an estimated `tokens` may start; returns the seconds waited.
+
+        Raises RateLimited without waiting if the budget would take longer
+        than `max_wait` to free up.
+        """
+        waits = []
+        if self.requests:
+            waits.append((self.requests, 1, self.requests.reserve(1)))
+        if self.tokens and tokens:
+            waits.append((self.tokens, tokens, self.tokens.reserve(tokens)))
+        delay = max((wait for _, _, wait in waits), default=0.0)
+        if delay > self.max_wait:
+            for bucket, amount, _ in waits:
+                bucket.refund(amount)
+            raise RateLimited(f"Rate limit budget exhausted for {delay:.1f}s", retry_after=delay)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the token budget once the real usage of a request is known."""
+        if self.tokens and actual is not None:
+            self.tokens.refund(estimated - actual)
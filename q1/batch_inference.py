@@ -0,0 +1,172 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class BatchingStats:
+    """Throughput counters for a batching engine."""
+    requests: int = 0
+    batches: int = 0
+    prompt_tokens: int = 0
+    generated_tokens: int = 0
+    generate_seconds: float = 0.0
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        return self.generated_tokens / self.generate_seconds if self.generate_seconds else 0.0
+
+
+class BatchedGenerator:
+    """Collect concurrent prompts into padded batches and run one `generate` per batch.
+
+    Prompts are queued by `submit`. A single worker thread takes the first
+    waiting prompt, then keeps collecting for up to `max_wait_ms` or until
+    `max_batch_size` prompts are waiting, and generates for all of them at once.
+    A prompt that ends up alone in its batch is generated from `prefix_cache`
+    when it starts with the cached prefix, so the shared system prompt isn't
+    prefilled again.
+    """
+
+    def __init__(
+        self,
+        tokenizer,
+        model,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 20,
+        generation_kwargs: Optional[dict] = None,
+        prefix_cache=None,
+    ):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.generation_kwargs = generation_kwargs or {}
+        self.prefix_cache = prefix_cache
+        self.stats = BatchingStats()
+
+        # Decoder-only models continue from the right edge of the prompt, so
+        # batches have to be padded on the left.
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        self._queue: "queue.Queue[Optional[tuple[str, Future]]]" = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="batched-generator", daemon=True)
+        self._worker.start()
+
+    def submit(self, prompt: str) -> Future:
+        """Queue a formatted prompt; the future resolves to (response, token count)."""
+        if self._closed:
+            raise RuntimeError("Batching engine has been closed")
+        future: Future = Future()
+        self._queue.put((prompt, future))
+        return future
+
+    def generate(self, prompt: str) -> tuple[str, int]:
+        """Submit a prompt and block until its batch has been generated."""
+        return self.submit(prompt).result()
+
+    def close(self):
+        """Stop the worker once already queued prompts have been served."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+
+    def _collect_batch(self, first: tuple[str, Future]) -> tuple[list[tuple[str, Future]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect_batch(first)
+            try:
+                results = self._generate_batch([prompt for prompt, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            if stop:
+                return
+
+    def _generate_batch(self, prompts: list[str]) -> list[tuple[str, int]]:
+        import torch
+
+        prefix = self.prefix_cache.prefix_text if self.prefix_cache else None
+        if len(prompts) == 1 and prefix and prompts[0].startswith(prefix):
+            return [self._generate_from_prefix(prompts[0][len(prefix):])]
+
+        inputs = self.tokenizer(
+            prompts,
+            return_tensors="pt",
+            padding=True,
+            add_special_tokens=True,
+        )
+        padded_length = inputs["input_ids"].shape[1]
+
+        start = time.perf_counter()
+        with torch.no_grad():
+            outputs = self.model.generate(
+                inputs["input_ids"],
+                attention_mask=inputs["attention_mask"],
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.tokenizer.eos_token_id,
+                **self.generation_kwargs,
+            )
+        elapsed = time.perf_counter() - start
+
+        results = []
+        batch_prompt_tokens = 0
+        batch_generated_tokens = 0
+        for row, mask in zip(outputs, inputs["attention_mask"]):
+            new_tokens = row[padded_length:].tolist()
+            # Finished rows are padded out to the longest one; only count up
+            # to and including the first end-of-sequence token.
+            if self.tokenizer.eos_token_id in new_tokens:
+                new_tokens = new_tokens[:new_tokens.index(self.tokenizer.eos_token_id) + 1]
+            prompt_tokens = int(mask.sum())
+            response = self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+            results.append((response.strip(), prompt_tokens + len(new_tokens)))
+            batch_prompt_tokens += prompt_tokens
+            batch_generated_tokens += len(new_tokens)
+
+        self._record(len(prompts), batch_prompt_tokens, batch_generated_tokens, elapsed)
+        return results
+
+    def _generate_from_prefix(self, suffix: str) -> tuple[str, int]:
+        start = time.perf_counter()
+        response, prompt_tokens, generated_tokens = self.prefix_cache.generate(suffix, **self.generation_kwargs)
+        self._record(1, prompt_tokens, generated_tokens, time.perf_counter() - start)
+        return response, prompt_tokens + generated_tokens
+
+    def _record(self, requests: int, prompt_tokens: int, generated_tokens: int, elapsed: float):
+        self.stats.requests += requests
+        self.stats.batches += 1
+        self.stats.prompt_tokens += prompt_tokens
+        self.stats.generated_tokens += generated_tokens
+        self.stats.generate_seconds += elapsed
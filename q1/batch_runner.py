@@ -0,0 +1,139 @@
+import asyncio
+import csv
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator
+
+
+@dataclass
+class BatchSummary:
+    """Counts collected over one batch run."""
+    completed: int = 0
+    skipped: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+
+def read_prompts(path: Path) -> Iterator[dict]:
+    """Stream prompts from a JSONL or CSV file as {"id", "prompt"} dicts.
+
+    Each record needs a `prompt` field; `id` is optional and defaults to the
+    record's position in the file so that resumed runs can match it up again.
+    """
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8") as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                yield _prompt_record(row, index)
+    else:
+        with path.open(encoding="utf-8") as f:
+            index = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                yield _prompt_record(json.loads(line), index)
+                index += 1
+
+
+def _prompt_record(row: dict, index: int) -> dict:
+    if not row.get("prompt"):
+        raise ValueError(f"Prompt record {index} has no 'prompt' field")
+    prompt_id = row.get("id")
+    if prompt_id is None or prompt_id == "":
+        prompt_id = index
+    return {"id": str(prompt_id), "prompt": row["prompt"]}
+
+
+def load_completed(output_path: Path) -> set[tuple[str, str]]:
+    """Return (prompt id, model) pairs that already have a successful result.
+
+    A crash can leave a half-written last line behind; it is cut off here so
+    that new results are appended on a clean line.
+    """
+    completed = set()
+    if not output_path.exists():
+        return completed
+
+    with output_path.open("rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+            data = data[:data.rfind(b"\n") + 1]
+
+    for line in data.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        key = (record["id"], record["model"])
+        if record.get("error"):
+            completed.discard(key)
+        else:
+            completed.add(key)
+    return completed
+
+
+async def run_batch(
+    prompts: Iterator[dict],
+    models: list[str],
+    call: Callable[[str, str], Awaitable[dict]],
+    output_path: Path,
+    concurrency: int = 4,
+    resume: bool = True,
+    on_result: Callable[[dict], None] = None,
+) -> BatchSummary:
+    """Send every prompt to every model with at most `concurrency` calls in flight.
+
+    `call(model_name, prompt)` must return a dict with response, tokens,
+    latency and error keys. Results are appended to `output_path` as JSONL as
+    soon as they arrive, so an interrupted run can be resumed.
+    """
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+    summary = BatchSummary()
+    start = time.perf_counter()
+    completed = load_completed(output_path) if resume else set()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+
+    with output_path.open("a" if resume else "w", encoding="utf-8") as out:
+
+        async def worker():
+            while True:
+                job = await queue.get()
+                if job is None:
+                    queue.task_done()
+                    return
+                record, model_name = job
+                result = await call(model_name, record["prompt"])
+                line = {"id": record["id"], "prompt": record["prompt"], **result}
+                out.write(json.dumps(line, ensure_ascii=False) + "\n")
+                out.flush()
+                if result.get("error"):
+                    summary.errors += 1
+                else:
+                    summary.completed += 1
+                if on_result:
+                    on_result(line)
+                queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        try:
+            # The queue is bounded, so prompts are read from disk only as
+            # fast as the workers can take them.
+            for record in prompts:
+                for model_name in models:
+                    if (record["id"], model_name) in completed:
+                        summary.skipped += 1
+                        continue
+                    await queue.put((record, model_name))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            os.fsync(out.fileno())
+
+    summary.elapsed = time.perf_counter() - start
+    return summary
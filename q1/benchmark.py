@@ -0,0 +1,81 @@
+from typing import Awaitable, Callable, Optional
+
+# A small fixed prompt set so numbers are comparable between runs
+BENCHMARK_PROMPTS = [
+    "Explain what a large language model is in two sentences.",
+    "Write a haiku about the ocean.",
+    "List three differences between Python lists and tuples.",
+]
+
+
+def _ignore_update(result: dict):
+    pass
+
+
+async def run_benchmark(
+    models: list[str],
+    prompts: list[str],
+    runs: int,
+    stream: Callable[[str, str, Callable[[dict], None]], Awaitable[dict]],
+    warmup_runs: int = 1,
+    on_sample: Optional[Callable[[dict], None]] = None,
+) -> list[dict]:
+    """Stream every prompt through every model `runs` times and collect one sample per call.
+
+    `stream(model_name, prompt, on_update)` must return the result dict produced
+    by `stream_model`. Calls are made one at a time so models don't compete for
+    CPU or bandwidth, and warm-up calls (model loading, connection setup) are
+    not recorded.
+    """
+    for model_name in models:
+        for _ in range(warmup_runs):
+            await stream(model_name, prompts[0], _ignore_update)
+
+    samples = []
+    for run in range(runs):
+        for prompt in prompts:
+            for model_name in models:
+                result = await stream(model_name, prompt, _ignore_update)
+                metrics = result["metrics"]
+                completion_tokens = result.get("completion_tokens")
+                sample = {
+                    "model": model_name,
+                    "run": run,
+                    "prompt": prompt,
+                    "latency": metrics.total,
+                    "ttft": metrics.ttft,
+                    "mean_itl": metrics.mean_itl,
+                    "tokens": result.get("tokens"),
+                    "completion_tokens": completion_tokens,
+                    "tokens_per_sec": (
+                        completion_tokens / metrics.total
+                        if completion_tokens and metrics.total else None
+                    ),
+                    "error": result.get("error"),
+                }
+                samples.append(sample)
+                if on_sample:
+                    on_sample(sample)
+    return samples
+
+
+def summarize(samples: list[dict]):
+    """Aggregate samples into one row of latency percentiles and throughput per model."""
+    import pandas as pd
+
+    df = pd.DataFrame(samples)
+    ok = df[df["error"].isna()]
+    grouped = ok.groupby("model")
+    summary = pd.DataFrame({
+        "calls": df.groupby("model").size(),
+        "errors": df.groupby("model")["error"].count(),
+        "p50_latency": grouped["latency"].quantile(0.50),
+        "p95_latency": grouped["latency"].quantile(0.95),
+        "p99_latency": grouped["latency"].quantile(0.99),
+        "p50_ttft": grouped["ttft"].quantile(0.50),
+        "p95_ttft": grouped["ttft"].quantile(0.95),
+        "mean_itl": grouped["mean_itl"].mean(),
+        "tokens_per_sec": grouped["tokens_per_sec"].mean(),
+        "mean_tokens": grouped["tokens"].mean(),
+    })
+    return summary.reindex(df["model"].unique())
@@ -0,0 +1,145 @@
+import time
+from enum import Enum
+from typing import Callable, Optional
+
+
+class CPUMode(str, Enum):
+    FP32 = "fp32"
+    INT8 = "int8"
+    BF16 = "bf16"
+
+
+def configure_threads(intra_op_threads: Optional[int] = None, inter_op_threads: Optional[int] = None):
+    """Set torch's thread pools explicitly instead of relying on its defaults."""
+    import torch
+
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        try:
+            torch.set_num_interop_threads(inter_op_threads)
+        except RuntimeError:
+            # Can only be set before torch starts any parallel work
+            pass
+
+
+def bf16_supported() -> bool:
+    """Whether this CPU has native bf16 kernels (AVX512-BF16/AMX on x86, BF16 on ARM)."""
+    import torch
+
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def optimize_model(model, mode: CPUMode, compile_model: bool = False):
+    """Return `model` converted for fast CPU inference in the given mode."""
+    import torch
+
+    if mode == CPUMode.INT8:
+        # Dynamic quantization stores Linear weights as int8 and quantizes
+        # activations on the fly; it needs no calibration data.
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    elif mode == CPUMode.BF16:
+        if not bf16_supported():
+            raise ValueError("bf16 mode needs a CPU with native bf16 support")
+        model = model.to(torch.bfloat16)
+
+    if compile_model:
+        model.forward = torch.compile(model.forward, dynamic=True)
+
+    model.eval()
+    return model
+
+
+def make_cpu_loader(
+    mode: CPUMode,
+    compile_model: bool = False,
+    base_loader: Optional[Callable[[str], tuple[object, object]]] = None,
+) -> Callable[[str], tuple[object, object]]:
+    """Build a registry loader that loads a model and optimizes it for `mode`."""
+    from model_registry import load_hf_model
+
+    base_loader = base_loader or load_hf_model
+
+    def loader(model_id: str) -> tuple[object, object]:
+        tokenizer, model = base_loader(model_id)
+        return tokenizer, optimize_model(model, mode, compile_model)
+
+    return loader
+
+
+def _greedy_generate(tokenizer, model, chat_prompt: str, max_new_tokens: int) -> tuple[list[int], float]:
+    import torch
+
+    inputs = tokenizer(chat_prompt, return_tensors="pt", add_special_tokens=True)
+    start = time.perf_counter()
+    with torch.no_grad():
+        outputs = model.generate(
+            inputs["input_ids"],
+            attention_mask=inputs["attention_mask"],
+            max_new_tokens=max_new_tokens,
+            do_sample=False,
+            pad_token_id=tokenizer.pad_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+        )
+    elapsed = time.perf_counter() - start
+    return outputs[0][inputs["input_ids"].shape[1]:].tolist(), elapsed
+
+
+def token_agreement(reference: list[int], candidate: list[int]) -> float:
+    """Fraction of reference positions where the candidate generated the same token."""
+    if not reference:
+        return 1.0 if not candidate else 0.0
+    matches = sum(1 for ref, cand in zip(reference, candidate) if ref == cand)
+    return matches / max(len(reference), len(candidate))
+
+
+def run_mode_report(
+    model_id: str,
+    prompts: list[str],
+    format_prompt: Callable[[str], str],
+    modes: list[tuple[CPUMode, bool]],
+    max_new_tokens: int = 50,
+    base_loader: Optional[Callable[[str], tuple[object, object]]] = None,
+) -> list[dict]:
+    """Compare CPU modes against the fp32 baseline on a fixed prompt set.
+
+    Each (mode, compile) pair is loaded fresh and run with greedy decoding so
+    outputs are deterministic. Accuracy is the token agreement with the fp32
+    outputs and the share of prompts whose output matches fp32 exactly.
+    """
+    from model_registry import estimate_model_bytes
+
+    rows = []
+    reference: Optional[list[list[int]]] = None
+    baseline_seconds = None
+    for mode, compile_model in [(CPUMode.FP32, False)] + [m for m in modes if m != (CPUMode.FP32, False)]:
+        tokenizer, model = make_cpu_loader(mode, compile_model, base_loader)(model_id)
+
+        # One untimed call so lazy initialisation and compilation aren't measured
+        _greedy_generate(tokenizer, model, format_prompt(prompts[0]), max_new_tokens)
+
+        outputs, seconds = [], 0.0
+        for prompt in prompts:
+            tokens, elapsed = _greedy_generate(tokenizer, model, format_prompt(prompt), max_new_tokens)
+            outputs.append(tokens)
+            seconds += elapsed
+
+        if reference is None:
+            reference, baseline_seconds = outputs, seconds
+        generated = sum(len(tokens) for tokens in outputs)
+        rows.append({
+            "mode": mode.value + ("+compile" if compile_model else ""),
+            "size_mb": estimate_model_bytes(model) / 1024 ** 2,
+            "seconds": seconds,
+            "tokens_per_sec": generated / seconds if seconds else 0.0,
+            "speedup": baseline_seconds / seconds if seconds else 0.0,
+            "token_agreement": sum(
+                token_agreement(ref, out) for ref, out in zip(reference, outputs)
+            ) / len(prompts),
+            "exact_match": sum(ref == out for ref, out in zip(reference, outputs)) / len(prompts),
+        })
+        del model
+    return rows
@@ -0,0 +1,123 @@
+"""Offline stand-ins for the OpenAI and Gemini SDK clients.
+
+They mimic just enough of each SDK's response shapes for model_comparison.py
+to run unchanged, with configurable latency, so benchmarks can run in CI
+without API keys or network access.
+"""
+import random
+import time
+from types import SimpleNamespace
+
+
+class FakeLatency:
+    """Latency profile of a fake provider, in milliseconds."""
+
+    def __init__(self, first_token_ms: float = 200, per_token_ms: float = 10, jitter: float = 0.1):
+        self.first_token_ms = first_token_ms
+        self.per_token_ms = per_token_ms
+        self.jitter = jitter
+
+    def sleep(self, milliseconds: float):
+        spread = milliseconds * self.jitter
+        time.sleep(max(0.0, milliseconds + random.uniform(-spread, spread)) / 1000)
+
+
+def fake_response_words(model: str, prompt: str, response_tokens: int) -> list[str]:
+    """Build a deterministic response of `response_tokens` whitespace-separated words."""
+    seed = f"Simulated {model} answer to: {prompt}".split()
+    return [seed[i % len(seed)] for i in range(response_tokens)]
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+class _FakeCompletions:
+    def __init__(self, latency: FakeLatency, response_tokens: int):
+        self.latency = latency
+        self.response_tokens = response_tokens
+
+    def create(self, model: str, messages: list[dict], stream: bool = False, stream_options: dict = None, **kwargs):
+        prompt = messages[-1]["content"]
+        words = fake_response_words(model, prompt, self.response_tokens)
+        usage = SimpleNamespace(
+            prompt_tokens=count_words(prompt),
+            completion_tokens=len(words),
+            total_tokens=count_words(prompt) + len(words),
+        )
+        if stream:
+            return self._stream(words, usage, include_usage=bool(stream_options and stream_options.get("include_usage")))
+
+        self.latency.sleep(self.latency.first_token_ms + self.latency.per_token_ms * len(words))
+        message = SimpleNamespace(content=" ".join(words))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _stream(self, words: list[str], usage, include_usage: bool):
+        self.latency.sleep(self.latency.first_token_ms)
+        for i, word in enumerate(words):
+            if i:
+                self.latency.sleep(self.latency.per_token_ms)
+            delta = SimpleNamespace(content=word if i == 0 else " " + word)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+        if include_usage:
+            yield SimpleNamespace(choices=[], usage=usage)
+
+
+class FakeOpenAIClient:
+    """Stand-in for `openai.OpenAI` supporting `chat.completions.create`."""
+
+    def __init__(self, latency: FakeLatency = None, response_tokens: int = 60):
+        self.chat = SimpleNamespace(completions=_FakeCompletions(latency or FakeLatency(), response_tokens))
+
+
+class _FakeGeminiResponse:
+    def __init__(self, chunks: list[str], usage_metadata, latency: FakeLatency = None):
+        self._chunks = chunks
+        self._latency = latency
+        self.usage_metadata = usage_metadata
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def __iter__(self):
+        if self._latency:
+            self._latency.sleep(self._latency.first_token_ms)
+        for i, chunk in enumerate(self._chunks):
+            if i and self._latency:
+                self._latency.sleep(self._latency.per_token_ms * count_words(chunk))
+            yield SimpleNamespace(text=chunk)
+
+
+class FakeGeminiModel:
+    """Stand-in for `genai.GenerativeModel` supporting `generate_content` and `count_tokens`."""
+
+    def __init__(self, model_name: str = "gemini-2.0-flash", latency: FakeLatency = None,
+                 response_tokens: int = 60, words_per_chunk: int = 8):
+        self.model_name = model_name
+        self.latency = latency or FakeLatency()
+        self.response_tokens = response_tokens
+        self.words_per_chunk = words_per_chunk
+
+    def count_tokens(self, contents) -> SimpleNamespace:
+        if isinstance(contents, str):
+            contents = [contents]
+        return SimpleNamespace(total_tokens=sum(count_words(str(c)) for c in contents))
+
+    def generate_content(self, contents, stream: bool = False, **kwargs):
+        prompt = contents if isinstance(contents, str) else " ".join(str(c) for c in contents)
+        words = fake_response_words(self.model_name, prompt, self.response_tokens)
+        chunks = [
+            (" " if i else "") + " ".join(words[i:i + self.words_per_chunk])
+            for i in range(0, len(words), self.words_per_chunk)
+        ]
+        usage = SimpleNamespace(
+            prompt_token_count=count_words(prompt),
+            candidates_token_count=len(words),
+            total_token_count=count_words(prompt) + len(words),
+        )
+        if stream:
+            return _FakeGeminiResponse(chunks, usage, self.latency)
+
+        self.latency.sleep(self.latency.first_token_ms + self.latency.per_token_ms * len(words))
+        return _FakeGeminiResponse(chunks, usage)
@@ -1,17 +1,36 @@
 import os
+import sys
 import typer
 import asyncio
 from rich.console import Console
 from rich.table import Table
+from rich.live import Live
+from rich.text import Text
 from rich import print as rprint
 from rich.prompt import Prompt, IntPrompt
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Callable, Iterator, Optional
 from enum import Enum
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-from openai import OpenAI
-import google.generativeai as genai
+from pathlib import Path
+import time
+import threading
+try:
+    import llm_client
+except ImportError:
+    # Not installed with `pip install -e .`; use the checkout's copy at the repository root
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+    import llm_client
+from providers import ProviderRegistry
+from model_registry import ModelRegistry
+from cpu_optimization import CPUMode, bf16_supported, configure_threads, make_cpu_loader, run_mode_report
+from batch_runner import read_prompts, run_batch
+from batch_inference import BatchedGenerator
+from prefix_cache import ChatSession, PrefixCache
+from response_cache import ResponseCache
+from streaming import StreamChunk, StreamMetrics, iterate_in_thread
+from fake_providers import FakeLatency, FakeOpenAIClient, FakeGeminiModel
+from benchmark import BENCHMARK_PROMPTS, run_benchmark, summarize
+from visualization import plot_benchmark, plot_token_usage
 
 # Load environment variables
 load_dotenv()
@@ -20,27 +39,27 @@ load_dotenv()
 console = Console()
 
 # Validate API keys
-def validate_api_keys():
-    openai_key = os.getenv("OPENAI_API_KEY")
-    gemini_key = os.getenv("GOOGLE_API_KEY")
-    
-    if not openai_key:
-        console.print("[bold red]Warning:[/] OPENAI_API_KEY not found in .env file")
-    if not gemini_key:
-        console.print("[bold red]Warning:[/] GOOGLE_API_KEY not found in .env file")
-    
-    return openai_key, gemini_key
+def validate_api_key(env_var: str) -> Optional[str]:
+    key = os.getenv(env_var)
+    if not key:
+        console.print(f"[bold red]Warning:[/] {env_var} not found in .env file")
+    return key
 
-# Initialize clients after validation
-openai_key, gemini_key = validate_api_keys()
-openai_client = OpenAI(api_key=openai_key) if openai_key else None
+# Provider SDKs are slow to import, so each client is only imported and
+# configured the first time a model from that provider is used. Both go
+# through the shared llm_client for timeouts, rate limits and retries
+# (configured with the LLM_* environment variables).
+def build_openai_client():
+    openai_key = validate_api_key("OPENAI_API_KEY")
+    if not openai_key:
+        return None
+    return llm_client.openai_client(openai_key)
 
-# Configure Gemini
-if gemini_key:
-    genai.configure(api_key=gemini_key)
-    gemini_model = genai.GenerativeModel('gemini-2.0-flash')
-else:
-    gemini_model = None
+def build_gemini_model():
+    gemini_key = validate_api_key("GOOGLE_API_KEY")
+    if not gemini_key:
+        return None
+    return llm_client.gemini_model('gemini-2.0-flash', gemini_key)
 
 class ModelType(str, Enum):
     BASE = "base"
@@ -52,6 +71,16 @@ class ModelProvider(str, Enum):
     GEMINI = "gemini"  # Changed from ANTHROPIC to GEMINI
     HUGGINGFACE = "huggingface"
 
+providers = ProviderRegistry()
+providers.register(ModelProvider.OPENAI, build_openai_client)
+providers.register(ModelProvider.GEMINI, build_gemini_model)
+
+def install_fake_providers(first_token_ms: float, per_token_ms: float):
+    """Swap the OpenAI and Gemini clients for offline fakes with the given latency."""
+    latency = FakeLatency(first_token_ms=first_token_ms, per_token_ms=per_token_ms)
+    providers[ModelProvider.OPENAI].override(llm_client.OpenAIChat(FakeOpenAIClient(latency)))
+    providers[ModelProvider.GEMINI].override(llm_client.GeminiModel(FakeGeminiModel('gemini-2.0-flash', latency)))
+
 # Model characteristics
 MODEL_INFO = {
     "gpt-3.5-turbo": {
@@ -77,70 +106,401 @@ MODEL_INFO = {
     }
 }
 
+# Local models are loaded once and kept resident across prompts.
+# HF_RAM_BUDGET_MB caps how much RAM resident models may use before the
+# least recently used one is evicted.
+HF_MODEL_IDS = {
+    "TinyLlama-1.1B-Chat": "TinyLlama/TinyLlama-1.1B-Chat-v1.0",
+}
+
+ram_budget_mb = os.getenv("HF_RAM_BUDGET_MB")
+model_registry = ModelRegistry(
+    ram_budget_bytes=int(ram_budget_mb) * 1024 * 1024 if ram_budget_mb else None
+)
+
+# Local models run on CPU. HF_CPU_MODE selects fp32, dynamic int8 quantization
+# or bf16 weights, HF_NUM_THREADS sets torch's intra-op thread count and
+# HF_COMPILE=1 wraps the forward pass in torch.compile.
+local_backend = {
+    "mode": CPUMode(os.getenv("HF_CPU_MODE", CPUMode.FP32.value)),
+    "threads": int(os.getenv("HF_NUM_THREADS", "0")) or None,
+    "compile": os.getenv("HF_COMPILE", "").lower() in ("1", "true", "yes"),
+}
+
+def configure_local_backend(mode: CPUMode, threads: Optional[int] = None, compile_model: bool = False):
+    """Select how local models are optimized; already loaded models are reloaded on next use."""
+    local_backend.update(mode=mode, threads=threads, compile=compile_model)
+    for local_name in HF_MODEL_IDS:
+        model_registry.evict(local_name)
+
+def local_loader(model_id: str) -> tuple[object, object]:
+    """Load a local model with the currently selected CPU mode and thread settings."""
+    configure_threads(local_backend["threads"])
+    return make_cpu_loader(local_backend["mode"], local_backend["compile"])(model_id)
+
+for local_name, model_id in HF_MODEL_IDS.items():
+    model_registry.register(local_name, model_id, loader=local_loader)
+
+HF_SYSTEM_PROMPT = "You are a helpful AI assistant that provides accurate and concise answers."
+HF_SYSTEM_PREFIX = f"<|system|>{HF_SYSTEM_PROMPT}</s>"
+HF_GENERATION_KWARGS = {
+    "max_new_tokens": 100,  # Limit response length
+    "do_sample": True,
+    "temperature": 0.7,  # Add some randomness but keep responses focused
+    "top_p": 0.9,
+    "repetition_penalty": 1.2,  # Prevent repetitive outputs
+}
+
+# Concurrent prompts for a local model are grouped into padded batches.
+# HF_MAX_BATCH_SIZE caps the batch and HF_BATCH_WAIT_MS is how long the
+# engine waits for more prompts after the first one arrives.
+HF_MAX_BATCH_SIZE = int(os.getenv("HF_MAX_BATCH_SIZE", "8"))
+HF_BATCH_WAIT_MS = float(os.getenv("HF_BATCH_WAIT_MS", "20"))
+# The system prompt's key/values are computed once per model and reused by
+# every generation that starts with it. HF_PREFIX_CACHE=0 turns this off.
+HF_PREFIX_CACHE = os.getenv("HF_PREFIX_CACHE", "1") != "0"
+batch_engines: dict[str, BatchedGenerator] = {}
+batch_engines_lock = threading.Lock()
+
+def release_batch_engine(entry):
+    """Stop the batching engine of an evicted model so the model can be freed."""
+    with batch_engines_lock:
+        engine = batch_engines.get(entry.name)
+        if engine is not None and engine.model is entry.model:
+            batch_engines.pop(entry.name).close()
+
+model_registry.add_evict_listener(release_batch_engine)
+
+# Responses are cached on disk so re-running the same prompts doesn't re-bill
+# the APIs or re-run local generation.
+response_cache = ResponseCache(
+    Path(os.getenv("RESPONSE_CACHE_PATH", Path(__file__).with_name(".response_cache.sqlite3"))),
+    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "168")) * 3600,
+    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")),
+)
+
 async def call_openai(prompt: str) -> tuple[str, int]:
     """Call OpenAI API and return response and token count."""
+    openai_client = await asyncio.to_thread(providers[ModelProvider.OPENAI].get)
     if not openai_client:
         raise ValueError("OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file.")
     
-    response = openai_client.chat.completions.create(
+    # The SDK call blocks, so run it in a worker thread to let other
+    # providers make progress concurrently.
+    response = await asyncio.to_thread(
+        openai_client.chat.completions.create,
         model="gpt-3.5-turbo",
         messages=[{"role": "user", "content": prompt}]
     )
     return response.choices[0].message.content, response.usage.total_tokens
 
+def gemini_token_counts(prompt: str, response) -> tuple[int, int]:
+    """Return (total, completion) token counts for a Gemini response.
+
+    Uses the usage metadata returned with the response, and falls back to
+    the count_tokens endpoint for SDK versions that don't report usage.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage and usage.total_token_count:
+        return usage.total_token_count, usage.candidates_token_count
+    gemini_model = providers[ModelProvider.GEMINI].get()
+    prompt_tokens = gemini_model.count_tokens(prompt).total_tokens
+    completion_tokens = gemini_model.count_tokens(response.text).total_tokens
+    return prompt_tokens + completion_tokens, completion_tokens
+
 async def call_gemini(prompt: str) -> tuple[str, int]:
     """Call Gemini API and return response and token count."""
+    gemini_model = await asyncio.to_thread(providers[ModelProvider.GEMINI].get)
     if not gemini_model:
         raise ValueError("Google API key not configured. Please add GOOGLE_API_KEY to your .env file.")
     
     try:
-        response = gemini_model.generate_content(prompt)
-        
-        # Gemini doesn't provide token count directly, so we'll estimate
-        # by counting words (rough approximation)
-        token_estimate = len(prompt.split()) + len(response.text.split())
-        
-        return response.text, token_estimate
+        response = await asyncio.to_thread(gemini_model.generate_content, prompt)
+        total_tokens, _ = await asyncio.to_thread(gemini_token_counts, prompt, response)
+        return response.text, total_tokens
     except Exception as e:
         raise ValueError(f"Error calling Gemini API: {str(e)}")
 
-def call_huggingface(prompt: str) -> tuple[str, int]:
+def get_batch_engine(model_name: str) -> BatchedGenerator:
+    """Return the batching engine for a local model, loading the model if needed."""
+    loaded = model_registry.get(model_name)
+    with batch_engines_lock:
+        engine = batch_engines.get(model_name)
+        if engine is None or engine.model is not loaded.model:
+            engine = BatchedGenerator(
+                loaded.tokenizer,
+                loaded.model,
+                max_batch_size=HF_MAX_BATCH_SIZE,
+                max_wait_ms=HF_BATCH_WAIT_MS,
+                generation_kwargs=HF_GENERATION_KWARGS,
+                prefix_cache=PrefixCache(loaded.tokenizer, loaded.model, HF_SYSTEM_PREFIX) if HF_PREFIX_CACHE else None,
+            )
+            batch_engines[model_name] = engine
+        return engine
+
+def format_user_turn(prompt: str) -> str:
+    """Format one user turn in TinyLlama's chat format."""
+    return f"<|user|>{prompt}</s><|assistant|>"
+
+def format_chat_prompt(prompt: str) -> str:
+    """Format a user prompt in TinyLlama's chat format."""
+    return HF_SYSTEM_PREFIX + format_user_turn(prompt)
+
+def call_huggingface(prompt: str, model_name: str = "TinyLlama-1.1B-Chat") -> tuple[str, int]:
     """Use local HuggingFace model and return response and token count."""
-    model_name = "TinyLlama/TinyLlama-1.1B-Chat-v1.0"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name)
-    
-    # Format the prompt in chat format
-    chat_prompt = f"<|system|>You are a helpful AI assistant that provides accurate and concise answers.</s><|user|>{prompt}</s><|assistant|>"
-    
-    # Tokenize with proper attention mask
-    inputs = tokenizer(chat_prompt, 
-                      return_tensors="pt", 
-                      padding=True,
-                      add_special_tokens=True)
+    # Concurrent callers share a single padded generate call
+    return get_batch_engine(model_name).generate(format_chat_prompt(prompt))
+
+def stream_openai(prompt: str) -> Iterator[StreamChunk]:
+    """Stream an OpenAI chat completion chunk by chunk."""
+    openai_client = providers[ModelProvider.OPENAI].get()
+    if not openai_client:
+        raise ValueError("OpenAI API key not configured. Please add OPENAI_API_KEY to your .env file.")
     
-    # Create attention mask
-    attention_mask = inputs['input_ids'].ne(tokenizer.pad_token_id)
-    input_token_count = len(inputs.input_ids[0])
+    stream = openai_client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "user", "content": prompt}],
+        stream=True,
+        stream_options={"include_usage": True}
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield StreamChunk(text=chunk.choices[0].delta.content)
+        if chunk.usage:
+            yield StreamChunk(tokens=chunk.usage.total_tokens, completion_tokens=chunk.usage.completion_tokens)
+
+def stream_gemini(prompt: str) -> Iterator[StreamChunk]:
+    """Stream a Gemini response chunk by chunk."""
+    gemini_model = providers[ModelProvider.GEMINI].get()
+    if not gemini_model:
+        raise ValueError("Google API key not configured. Please add GOOGLE_API_KEY to your .env file.")
     
-    with torch.no_grad():
-        outputs = model.generate(
-            inputs.input_ids,
-            attention_mask=attention_mask,
-            max_length=input_token_count + 100,  # Limit response length
-            pad_token_id=tokenizer.pad_token_id,
-            eos_token_id=tokenizer.eos_token_id,
-            do_sample=True,
-            temperature=0.7,  # Add some randomness but keep responses focused
-            top_p=0.9,
-            repetition_penalty=1.2  # Prevent repetitive outputs
+    try:
+        response = gemini_model.generate_content(prompt, stream=True)
+        for chunk in response:
+            yield StreamChunk(text=chunk.text)
+        
+        total_tokens, completion_tokens = gemini_token_counts(prompt, response)
+        yield StreamChunk(tokens=total_tokens, completion_tokens=completion_tokens)
+    except Exception as e:
+        raise ValueError(f"Error calling Gemini API: {str(e)}")
+
+def stream_huggingface(prompt: str, model_name: str = "TinyLlama-1.1B-Chat") -> Iterator[StreamChunk]:
+    """Stream tokens from a local HuggingFace model as they are generated."""
+    import torch
+    from transformers import TextIteratorStreamer
+
+    engine = get_batch_engine(model_name)
+    tokenizer, model = engine.tokenizer, engine.model
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    prompt_tokens = []
+
+    errors = []
+
+    def generate():
+        try:
+            if engine.prefix_cache:
+                _, used, _ = engine.prefix_cache.generate(format_user_turn(prompt), streamer=streamer, **HF_GENERATION_KWARGS)
+                prompt_tokens.append(used)
+                return
+            inputs = tokenizer(format_chat_prompt(prompt), return_tensors="pt", add_special_tokens=True)
+            prompt_tokens.append(len(inputs["input_ids"][0]))
+            with torch.no_grad():
+                model.generate(
+                    inputs["input_ids"],
+                    attention_mask=inputs["attention_mask"],
+                    pad_token_id=tokenizer.pad_token_id,
+                    eos_token_id=tokenizer.eos_token_id,
+                    streamer=streamer,
+                    **HF_GENERATION_KWARGS
+                )
+        except Exception as e:
+            errors.append(e)
+            # A successful generate ends the stream itself; a failed one
+            # would leave the reader below waiting forever
+            streamer.end()
+
+    # generate() pushes decoded text into the streamer from its own thread
+    worker = threading.Thread(target=generate, daemon=True)
+    worker.start()
+    pieces = []
+    for text in streamer:
+        if text:
+            pieces.append(text)
+            yield StreamChunk(text=text)
+    worker.join()
+    if errors:
+        raise errors[0]
+
+    response_tokens = len(tokenizer("".join(pieces), add_special_tokens=False)["input_ids"])
+    yield StreamChunk(tokens=sum(prompt_tokens) + response_tokens, completion_tokens=response_tokens)
+
+def generation_params(model_name: str) -> dict:
+    """Return the generation parameters that shape a model's responses."""
+    if MODEL_INFO[model_name]["provider"] == ModelProvider.HUGGINGFACE:
+        # Quantized and bf16 weights produce different outputs from fp32
+        return {**HF_GENERATION_KWARGS, "cpu_mode": local_backend["mode"].value}
+    return {}
+
+async def call_model(model_name: str, prompt: str) -> tuple[str, int]:
+    """Send a prompt to the provider behind `model_name`, using cached responses when available."""
+    provider = MODEL_INFO[model_name]["provider"]
+    params = generation_params(model_name)
+    cached = response_cache.get(provider.value, model_name, prompt, params)
+    if cached is not None:
+        return cached
+
+    if provider == ModelProvider.OPENAI:
+        response, tokens = await call_openai(prompt)
+    elif provider == ModelProvider.GEMINI:
+        response, tokens = await call_gemini(prompt)
+    else:
+        # Local generation is CPU-bound; keep it off the event loop
+        response, tokens = await asyncio.to_thread(call_huggingface, prompt, model_name)
+
+    response_cache.put(provider.value, model_name, prompt, params, response, tokens)
+    return response, tokens
+
+def open_stream(model_name: str, prompt: str) -> Callable[[], Iterator[StreamChunk]]:
+    """Return a factory for the blocking chunk stream of `model_name`."""
+    provider = MODEL_INFO[model_name]["provider"]
+    if provider == ModelProvider.OPENAI:
+        return lambda: stream_openai(prompt)
+    elif provider == ModelProvider.GEMINI:
+        return lambda: stream_gemini(prompt)
+    else:
+        return lambda: stream_huggingface(prompt, model_name)
+
+async def stream_model(
+    model_name: str,
+    prompt: str,
+    on_update: Callable[[dict], None]
+) -> dict:
+    """Stream a response, calling `on_update` with the partial result as each chunk arrives.
+
+    Records time to first token and the gaps between chunks. Cached
+    responses are replayed as a single chunk.
+    """
+    provider = MODEL_INFO[model_name]["provider"]
+    params = generation_params(model_name)
+    metrics = StreamMetrics()
+    result = {
+        "model": model_name, "response": "", "tokens": None, "completion_tokens": None,
+        "error": None, "metrics": metrics
+    }
+
+    try:
+        cached = response_cache.get(provider.value, model_name, prompt, params)
+        if cached is not None:
+            metrics.record()
+            result["response"], result["tokens"] = cached
+            on_update(result)
+        else:
+            pieces = []
+            async for chunk in iterate_in_thread(open_stream(model_name, prompt)):
+                if chunk.text:
+                    metrics.record()
+                    pieces.append(chunk.text)
+                    result["response"] = "".join(pieces)
+                    on_update(result)
+                if chunk.tokens is not None:
+                    result["tokens"] = chunk.tokens
+                if chunk.completion_tokens is not None:
+                    result["completion_tokens"] = chunk.completion_tokens
+            # An empty stream would otherwise be replayed as a hit on every later run
+            if result["response"]:
+                response_cache.put(provider.value, model_name, prompt, params, result["response"], result["tokens"])
+    except Exception as e:
+        result["error"] = str(e)
+        on_update(result)
+
+    metrics.finish()
+    result["latency"] = metrics.total
+    return result
+
+def format_seconds(value: Optional[float]) -> str:
+    return f"{value:.2f}s" if value is not None else "-"
+
+def build_stream_table(results: dict[str, dict]) -> Table:
+    """Build a table showing every model's partial response and stream timings."""
+    table = Table(title="Streaming Comparison", show_lines=True)
+    table.add_column("Model", style="green", no_wrap=True)
+    table.add_column("TTFT", style="cyan", justify="right")
+    table.add_column("Mean ITL", style="cyan", justify="right")
+    table.add_column("Total", style="cyan", justify="right")
+    table.add_column("Tokens", style="yellow", justify="right")
+    table.add_column("Response", style="white")
+
+    for model_name, result in results.items():
+        metrics = result.get("metrics")
+        if result.get("error"):
+            response = Text(f"Error: {result['error']}", style="bold red")
+        else:
+            response = Text(result.get("response") or "")
+        table.add_row(
+            model_name,
+            format_seconds(metrics.ttft if metrics else None),
+            format_seconds(metrics.mean_itl if metrics else None),
+            format_seconds(metrics.total if metrics else None),
+            str(result["tokens"]) if result.get("tokens") is not None else "-",
+            response,
         )
-    
-    # Decode only the new tokens (response)
-    response = tokenizer.decode(outputs[0][input_token_count:], skip_special_tokens=True)
-    output_token_count = len(outputs[0])
-    
-    return response.strip(), input_token_count + output_token_count
+    return table
+
+async def stream_all_models(model_names: list[str], prompt: str) -> list[dict]:
+    """Stream one prompt to several models at once, rendering all of them live."""
+    results = {name: {"model": name} for name in model_names}
+    with Live(build_stream_table(results), console=console, refresh_per_second=12) as live:
+        def on_update(result: dict):
+            results[result["model"]] = result
+            live.update(build_stream_table(results))
+
+        finished = await asyncio.gather(*(stream_model(name, prompt, on_update) for name in model_names))
+        for result in finished:
+            results[result["model"]] = result
+        live.update(build_stream_table(results))
+    return finished
+
+async def timed_call(model_name: str, prompt: str) -> dict:
+    """Call a model and record its wall-clock latency and any error."""
+    start = time.perf_counter()
+    result = {"model": model_name, "response": None, "tokens": None, "error": None}
+    try:
+        result["response"], result["tokens"] = await call_model(model_name, prompt)
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency"] = time.perf_counter() - start
+    return result
+
+async def compare_all_models(prompt: str) -> tuple[list[dict], float]:
+    """Send one prompt to every model in MODEL_INFO concurrently."""
+    start = time.perf_counter()
+    results = await asyncio.gather(*(timed_call(name, prompt) for name in MODEL_INFO))
+    return list(results), time.perf_counter() - start
+
+def display_comparison(results: list[dict], wall_clock: float):
+    """Display responses from several models side by side."""
+    table = Table(title="Model Comparison", show_lines=True)
+    table.add_column("Model", style="green", no_wrap=True)
+    table.add_column("Latency", style="cyan", justify="right")
+    table.add_column("Tokens", style="yellow", justify="right")
+    table.add_column("Response", style="white")
+
+    for result in results:
+        if result["error"]:
+            response = f"[bold red]Error:[/] {result['error']}"
+            tokens = "-"
+        else:
+            response = Text(result["response"])
+            tokens = str(result["tokens"]) if result["tokens"] is not None else "-"
+        table.add_row(result["model"], f"{result['latency']:.2f}s", tokens, response)
+
+    console.print(table)
+    sequential = sum(result["latency"] for result in results)
+    console.print(
+        f"\n[bold yellow]Wall clock:[/] {wall_clock:.2f}s "
+        f"(sequential would take ~{sequential:.2f}s)"
+    )
 
 def display_model_info(model_name: str):
     """Display information about the selected model."""
@@ -171,12 +531,285 @@ def display_available_models():
         )
     
     console.print(table)
+    console.print(f"[cyan]{len(MODEL_INFO) + 1}[/]. Compare all models")
     return len(MODEL_INFO)
 
-async def interactive_mode():
+def warm_up_local_models():
+    """Load every registered local model before the first prompt."""
+    with console.status("[bold cyan]Warming up local models..."):
+        for entry in model_registry.warm_up():
+            console.print(
+                f"[bold cyan]Loaded[/] {entry.name} in {entry.load_seconds:.1f}s "
+                f"({entry.size_bytes / 1024 ** 2:.0f} MB)"
+            )
+
+def display_registry_stats():
+    """Display local model cache counters."""
+    stats = model_registry.stats
+    if not (stats.loads or stats.hits):
+        return
+    console.print(
+        f"\n[bold yellow]Local model cache:[/] loads={stats.loads} hits={stats.hits} "
+        f"misses={stats.misses} evictions={stats.evictions} "
+        f"resident={model_registry.resident_bytes / 1024 ** 2:.0f} MB"
+    )
+
+async def run_prompts_file(
+    prompts_file: Path,
+    output: Optional[Path],
+    provider: Optional[ModelProvider],
+    concurrency: int,
+    resume: bool,
+):
+    """Run every prompt in a JSONL/CSV file against the selected models."""
+    models = [
+        name for name, info in MODEL_INFO.items()
+        if provider is None or info["provider"] == provider
+    ]
+    output = output or prompts_file.with_suffix(".results.jsonl")
+    console.print(
+        f"[bold cyan]Running[/] {prompts_file} against {', '.join(models)} "
+        f"(concurrency={concurrency}) -> {output}"
+    )
+
+    with console.status("[bold cyan]Processing prompts...") as status:
+        def on_result(record: dict):
+            status.update(f"[bold cyan]Processed prompt {record['id']} on {record['model']}")
+
+        summary = await run_batch(
+            read_prompts(prompts_file),
+            models,
+            timed_call,
+            output,
+            concurrency=concurrency,
+            resume=resume,
+            on_result=on_result,
+        )
+
+    table = Table(title="Batch Summary")
+    table.add_column("Completed", style="green")
+    table.add_column("Errors", style="red")
+    table.add_column("Skipped (resumed)", style="yellow")
+    table.add_column("Elapsed", style="cyan")
+    table.add_row(str(summary.completed), str(summary.errors), str(summary.skipped), f"{summary.elapsed:.1f}s")
+    console.print(table)
+
+def display_batching_stats():
+    """Display throughput of the local batching engines."""
+    for model_name, engine in batch_engines.items():
+        stats = engine.stats
+        if not stats.batches:
+            continue
+        console.print(
+            f"[bold yellow]{model_name} batching:[/] {stats.requests} prompts in "
+            f"{stats.batches} batches (avg {stats.average_batch_size:.1f}), "
+            f"{stats.tokens_per_second:.1f} tokens/sec"
+        )
+
+def display_prefill_stats():
+    """Display how much prompt prefill the system prompt and chat caches saved."""
+    for model_name, engine in batch_engines.items():
+        if not engine.prefix_cache or not engine.prefix_cache.stats.generations:
+            continue
+        stats = engine.prefix_cache.stats
+        console.print(
+            f"[bold yellow]{model_name} prefill:[/] {stats.reused_tokens} tokens reused, "
+            f"{stats.computed_tokens} computed ({stats.reuse_rate:.0%} reused) over "
+            f"{stats.generations} generations, {stats.prefill_seconds:.2f}s prefilling, "
+            f"prefix built in {stats.prefix_build_seconds:.2f}s"
+        )
+
+def display_cache_stats():
+    """Display response cache hit/miss counters."""
+    stats = response_cache.stats
+    if not (stats.hits or stats.misses or stats.writes):
+        return
+    console.print(
+        f"[bold yellow]Response cache:[/] hits={stats.hits} misses={stats.misses} "
+        f"hit rate={stats.hit_rate:.0%} writes={stats.writes} "
+        f"expired={stats.expired} evictions={stats.evictions}"
+    )
+
+def display_provider_stats():
+    """Display per-model call, retry and latency counters of the API providers."""
+    for model_name, stats in llm_client.shared_client().stats().items():
+        latency = (
+            f"p50={stats['latency_p50']:.2f}s p95={stats['latency_p95']:.2f}s"
+            if stats['latency_p50'] is not None else "no latency samples"
+        )
+        console.print(
+            f"[bold yellow]{model_name} API:[/] calls={stats['calls']} errors={stats['errors']} "
+            f"retries={stats['retries']} coalesced={stats['coalesced']} "
+            f"rate-limit wait={stats['rate_limit_wait_seconds']:.1f}s {latency}"
+        )
+
+def display_run_stats():
+    """Display cache, batching, prefill and provider counters at the end of a run."""
+    display_registry_stats()
+    display_batching_stats()
+    display_prefill_stats()
+    display_cache_stats()
+    display_provider_stats()
+
+async def run_single_model(model_name: str, prompt: str) -> dict:
+    """Send a prompt to one model and display its response."""
+    result = await timed_call(model_name, prompt)
+    if result["error"]:
+        console.print(f"[bold red]Error:[/] {result['error']}")
+        return result
+    
+    # Display model information
+    display_model_info(model_name)
+    
+    # Display response
+    console.print("\n[bold green]Response:[/]")
+    console.print(result["response"])
+    
+    # Display token usage
+    console.print(f"\n[bold yellow]Token usage:[/] {result['tokens']}")
+    return result
+
+async def chat_turn(session: ChatSession, model_name: str, prompt: str) -> dict:
+    """Continue a local multi-turn conversation and display the response."""
+    start = time.perf_counter()
+    try:
+        response, tokens, was_reset = await asyncio.to_thread(session.send, format_user_turn(prompt))
+    except Exception as e:
+        console.print(f"[bold red]Error:[/] {e}")
+        return {"model": model_name, "response": None, "tokens": None, "error": str(e)}
+    
+    display_model_info(model_name)
+    if was_reset:
+        console.print("[bold yellow]Conversation no longer fits the context window; history was cleared.[/]")
+    console.print(f"\n[bold green]Response (turn {session.turns}):[/]")
+    console.print(response)
+    console.print(f"\n[bold yellow]Token usage:[/] {tokens}")
+    return {"model": model_name, "response": response, "tokens": tokens, "error": None,
+            "latency": time.perf_counter() - start}
+
+async def stream_single_model(model_name: str, prompt: str) -> dict:
+    """Stream one model's response to the console and display its timings."""
+    display_model_info(model_name)
+    console.print("\n[bold green]Response:[/]")
+    
+    with Live(Text(""), console=console, refresh_per_second=12) as live:
+        result = await stream_model(model_name, prompt, lambda partial: live.update(Text(partial["response"])))
+    
+    if result["error"]:
+        console.print(f"[bold red]Error:[/] {result['error']}")
+        return result
+    
+    metrics = result["metrics"]
+    console.print(f"\n[bold yellow]Token usage:[/] {result['tokens']}")
+    console.print(
+        f"[bold yellow]Time to first token:[/] {format_seconds(metrics.ttft)}  "
+        f"[bold yellow]Mean inter-token latency:[/] {format_seconds(metrics.mean_itl)}  "
+        f"[bold yellow]Max inter-token latency:[/] {format_seconds(metrics.max_itl)}  "
+        f"[bold yellow]Total:[/] {format_seconds(metrics.total)}"
+    )
+    return result
+
+async def benchmark_models(
+    models: list[str],
+    prompts: list[str],
+    runs: int,
+    warmup_runs: int,
+    chart: Optional[Path],
+    results_csv: Optional[Path]
+):
+    """Benchmark streamed latency and throughput of each model and display a summary."""
+    # Benchmarks must measure the providers, not the response cache
+    response_cache.bypass = True
+    total_calls = len(models) * len(prompts) * runs
+    
+    with console.status("[bold cyan]Benchmarking...") as status:
+        completed = []
+        def on_sample(sample: dict):
+            completed.append(sample)
+            status.update(f"[bold cyan]Benchmarking... {len(completed)}/{total_calls} calls")
+        
+        samples = await run_benchmark(models, prompts, runs, stream_model, warmup_runs, on_sample)
+    
+    summary = summarize(samples)
+    table = Table(title=f"Benchmark ({runs} runs x {len(prompts)} prompts)")
+    table.add_column("Model", style="green", no_wrap=True)
+    for column in ["Errors", "p50", "p95", "p99", "TTFT p50", "TTFT p95", "Mean ITL", "Tokens/sec", "Tokens"]:
+        table.add_column(column, style="cyan", justify="right")
+    
+    def fmt(value, suffix="s", digits=3):
+        return "-" if value != value or value is None else f"{value:.{digits}f}{suffix}"
+    
+    for model_name, row in summary.iterrows():
+        table.add_row(
+            model_name,
+            f"{int(row['errors'])}/{int(row['calls'])}",
+            fmt(row["p50_latency"]),
+            fmt(row["p95_latency"]),
+            fmt(row["p99_latency"]),
+            fmt(row["p50_ttft"]),
+            fmt(row["p95_ttft"]),
+            fmt(row["mean_itl"]),
+            fmt(row["tokens_per_sec"], "", 1),
+            fmt(row["mean_tokens"], "", 0),
+        )
+    console.print(table)
+    
+    if results_csv:
+        import pandas as pd
+        pd.DataFrame(samples).to_csv(results_csv, index=False)
+        console.print(f"[bold cyan]Raw samples written to[/] {results_csv}")
+    if chart:
+        plot_benchmark(summary, chart)
+        console.print(f"[bold cyan]Chart written to[/] {chart}")
+
+def cpu_mode_report(
+    model_name: str,
+    modes: list[CPUMode],
+    include_compile: bool,
+    max_new_tokens: int,
+    threads: Optional[int]
+):
+    """Compare CPU inference modes of a local model against the fp32 baseline."""
+    configure_threads(threads)
+    if CPUMode.BF16 in modes and not bf16_supported():
+        console.print("[bold yellow]Skipping bf16:[/] this CPU has no native bf16 support")
+        modes = [mode for mode in modes if mode != CPUMode.BF16]
+    variants = [(mode, False) for mode in modes]
+    if include_compile:
+        variants += [(mode, True) for mode in [CPUMode.FP32] + modes]
+    
+    with console.status(f"[bold cyan]Running {len(variants) + 1} CPU modes on {len(BENCHMARK_PROMPTS)} prompts..."):
+        rows = run_mode_report(
+            HF_MODEL_IDS[model_name],
+            BENCHMARK_PROMPTS,
+            format_chat_prompt,
+            variants,
+            max_new_tokens=max_new_tokens
+        )
+    
+    table = Table(title=f"{model_name} CPU Modes (greedy, {max_new_tokens} new tokens)")
+    table.add_column("Mode", style="green")
+    for column in ["Size", "Time", "Tokens/sec", "Speedup", "Token agreement", "Exact match"]:
+        table.add_column(column, style="cyan", justify="right")
+    for row in rows:
+        table.add_row(
+            row["mode"],
+            f"{row['size_mb']:.0f} MB",
+            f"{row['seconds']:.2f}s",
+            f"{row['tokens_per_sec']:.1f}",
+            f"{row['speedup']:.2f}x",
+            f"{row['token_agreement']:.0%}",
+            f"{row['exact_match']:.0%}",
+        )
+    console.print(table)
+
+async def interactive_mode(stream: bool = False):
     """Run the model comparison tool in interactive mode."""
     console.print("\n[bold cyan]Welcome to the LLM Model Comparison Tool![/]\n")
     
+    # Local models keep the conversation (and its key/values) between prompts
+    chat_sessions: dict[str, ChatSession] = {}
+    
     while True:
         # Display available models
         num_models = display_available_models()
@@ -185,42 +818,43 @@ async def interactive_mode():
         try:
             model_num = IntPrompt.ask(
                 "\nSelect a model number (or 0 to exit)",
-                choices=[str(i) for i in range(num_models + 1)]
+                choices=[str(i) for i in range(num_models + 2)]
             )
             
             if model_num == 0:
                 console.print("\n[bold green]Thank you for using the Model Comparison Tool![/]\n")
                 break
             
-            # Get the selected model
-            model_name = list(MODEL_INFO.keys())[model_num - 1]
-            provider = MODEL_INFO[model_name]["provider"]
-            
             # Get the prompt
             prompt = Prompt.ask("\nEnter your prompt")
             
             console.print(f"\n[bold cyan]Processing prompt:[/] {prompt}\n")
             
-            try:
-                if provider == ModelProvider.OPENAI:
-                    response, tokens = await call_openai(prompt)
-                elif provider == ModelProvider.GEMINI:  # Changed from ANTHROPIC to GEMINI
-                    response, tokens = await call_gemini(prompt)
+            if model_num == num_models + 1:
+                if stream:
+                    await stream_all_models(list(MODEL_INFO), prompt)
                 else:
-                    response, tokens = call_huggingface(prompt)
-                
-                # Display model information
-                display_model_info(model_name)
-                
-                # Display response
-                console.print("\n[bold green]Response:[/]")
-                console.print(response)
-                
-                # Display token usage
-                console.print(f"\n[bold yellow]Token usage:[/] {tokens}")
-                
-            except Exception as e:
-                console.print(f"[bold red]Error:[/] {str(e)}")
+                    results, wall_clock = await compare_all_models(prompt)
+                    display_comparison(results, wall_clock)
+            else:
+                # Get the selected model
+                model_name = list(MODEL_INFO.keys())[model_num - 1]
+                is_local = MODEL_INFO[model_name]["provider"] == ModelProvider.HUGGINGFACE
+                if stream:
+                    await stream_single_model(model_name, prompt)
+                elif is_local and HF_PREFIX_CACHE:
+                    engine = await asyncio.to_thread(get_batch_engine, model_name)
+                    session = chat_sessions.get(model_name)
+                    # A session is tied to the model instance it was started on
+                    if session is None or session.prefix_cache is not engine.prefix_cache:
+                        session = chat_sessions[model_name] = ChatSession(
+                            engine.prefix_cache, MODEL_INFO[model_name]["context_window"], HF_GENERATION_KWARGS
+                        )
+                    elif Prompt.ask("Continue the previous conversation?", choices=["y", "n"], default="y") == "n":
+                        session.reset()
+                    await chat_turn(session, model_name, prompt)
+                else:
+                    await run_single_model(model_name, prompt)
             
             # Ask if user wants to continue
             if not Prompt.ask("\nWould you like to try another prompt?", choices=["y", "n"]) == "y":
@@ -231,62 +865,150 @@ async def interactive_mode():
             console.print("\n[bold green]Thank you for using the Model Comparison Tool![/]\n")
             break
 
+    display_run_stats()
+
 async def main(
     interactive: bool = typer.Option(False, "--interactive", "-i", help="Run in interactive mode"),
     prompt: Optional[str] = typer.Option(None, help="Input prompt for the models"),
     model_type: Optional[ModelType] = typer.Option(None, help="Type of model to use"),
     provider: Optional[ModelProvider] = typer.Option(None, help="Model provider to use"),
-    show_viz: bool = typer.Option(False, help="Show token usage visualization")
+    show_viz: bool = typer.Option(False, help="Show token usage visualization"),
+    warm_up: bool = typer.Option(False, help="Load local models at startup instead of on first use"),
+    compare_all: bool = typer.Option(False, help="Send the prompt to every model concurrently"),
+    prompts_file: Optional[Path] = typer.Option(None, help="JSONL or CSV file of prompts to run in batch"),
+    output: Optional[Path] = typer.Option(None, help="JSONL file for batch results"),
+    concurrency: int = typer.Option(4, min=1, help="Maximum number of in-flight model calls in batch mode"),
+    resume: bool = typer.Option(True, help="Skip prompts that already have results in the output file"),
+    no_cache: bool = typer.Option(False, help="Neither read nor write the response cache"),
+    refresh_cache: bool = typer.Option(False, help="Ignore cached responses but store the fresh ones"),
+    stream: bool = typer.Option(False, help="Render tokens as they arrive and report time to first token"),
+    hf_mode: Optional[CPUMode] = typer.Option(None, help="CPU inference mode for local models"),
+    hf_threads: Optional[int] = typer.Option(None, help="Intra-op threads for local models"),
+    hf_compile: bool = typer.Option(False, help="Wrap local models in torch.compile")
 ):
     """
     Compare different types of language models and their responses.
     """
+    response_cache.bypass = no_cache
+    response_cache.refresh = refresh_cache
+    if hf_mode or hf_threads or hf_compile:
+        configure_local_backend(
+            hf_mode or local_backend["mode"],
+            hf_threads or local_backend["threads"],
+            hf_compile or local_backend["compile"]
+        )
+
+    if warm_up:
+        warm_up_local_models()
+
     if interactive:
-        await interactive_mode()
+        await interactive_mode(stream)
         return
         
+    if prompts_file:
+        await run_prompts_file(prompts_file, output, provider, concurrency, resume)
+        display_run_stats()
+        return
+
+    if compare_all:
+        if not prompt:
+            console.print("[bold red]Error:[/] --prompt is required with --compare-all.")
+            raise typer.Exit(1)
+        if stream:
+            results = await stream_all_models(list(MODEL_INFO), prompt)
+        else:
+            results, wall_clock = await compare_all_models(prompt)
+            display_comparison(results, wall_clock)
+        display_run_stats()
+        if show_viz:
+            plot_token_usage(results)
+        return
+
     if not prompt or not provider:
         console.print("[bold red]Error:[/] Both --prompt and --provider are required in non-interactive mode.")
         raise typer.Exit(1)
     
-    try:
-        if provider == ModelProvider.OPENAI:
-            response, tokens = await call_openai(prompt)
-            model_name = "gpt-3.5-turbo"
-        elif provider == ModelProvider.GEMINI:
-            response, tokens = await call_gemini(prompt)
-            model_name = "gemini-2.0-flash"  # Updated model name
-        else:
-            response, tokens = call_huggingface(prompt)
-            model_name = "TinyLlama-1.1B-Chat"
-        
-        # Display model information
-        display_model_info(model_name)
-        
-        # Display response
-        console.print("\n[bold green]Response:[/]")
-        console.print(response)
-        
-        # Display token usage
-        console.print(f"\n[bold yellow]Token usage:[/] {tokens}")
-        
-    except Exception as e:
-        console.print(f"[bold red]Error:[/] {str(e)}")
+    model_name = next(name for name, info in MODEL_INFO.items() if info["provider"] == provider)
+    if stream:
+        result = await stream_single_model(model_name, prompt)
+    else:
+        result = await run_single_model(model_name, prompt)
+
+    display_run_stats()
+    if show_viz:
+        plot_token_usage([result])
 
 if __name__ == "__main__":
     app = typer.Typer()
     
-    @app.command()
+    @app.callback(invoke_without_command=True)
     def run(
+        ctx: typer.Context,
         interactive: bool = typer.Option(False, "--interactive", "-i", help="Run in interactive mode"),
         prompt: Optional[str] = typer.Option(None, help="Input prompt for the models"),
         model_type: Optional[ModelType] = typer.Option(None, help="Type of model to use"),
         provider: Optional[ModelProvider] = typer.Option(None, help="Model provider to use"),
-        show_viz: bool = typer.Option(False, help="Show token usage visualization")
+        show_viz: bool = typer.Option(False, help="Show token usage visualization"),
+        warm_up: bool = typer.Option(False, help="Load local models at startup instead of on first use"),
+        compare_all: bool = typer.Option(False, help="Send the prompt to every model concurrently"),
+        prompts_file: Optional[Path] = typer.Option(None, help="JSONL or CSV file of prompts to run in batch"),
+        output: Optional[Path] = typer.Option(None, help="JSONL file for batch results"),
+        concurrency: int = typer.Option(4, min=1, help="Maximum number of in-flight model calls in batch mode"),
+        resume: bool = typer.Option(True, help="Skip prompts that already have results in the output file"),
+        no_cache: bool = typer.Option(False, help="Neither read nor write the response cache"),
+        refresh_cache: bool = typer.Option(False, help="Ignore cached responses but store the fresh ones"),
+        stream: bool = typer.Option(False, help="Render tokens as they arrive and report time to first token"),
+        hf_mode: Optional[CPUMode] = typer.Option(None, help="CPU inference mode for local models"),
+        hf_threads: Optional[int] = typer.Option(None, help="Intra-op threads for local models"),
+        hf_compile: bool = typer.Option(False, help="Wrap local models in torch.compile")
     ):
         """
         Compare different types of language models and their responses.
         """
-        asyncio.run(main(interactive, prompt, model_type, provider, show_viz))
+        if ctx.invoked_subcommand is not None:
+            return
+        asyncio.run(main(interactive, prompt, model_type, provider, show_viz, warm_up, compare_all,
+                         prompts_file, output, concurrency, resume, no_cache, refresh_cache,
+                         stream, hf_mode, hf_threads, hf_compile))
+    
+    @app.command()
+    def benchmark(
+        runs: int = typer.Option(5, help="Number of times each prompt is sent to each model"),
+        warmup_runs: int = typer.Option(1, help="Unrecorded calls per model before measuring"),
+        model: Optional[list[str]] = typer.Option(None, help="Model to benchmark (repeatable, default: all)"),
+        prompt: Optional[list[str]] = typer.Option(None, help="Prompt to benchmark with (repeatable, default: built-in set)"),
+        fake_providers: bool = typer.Option(False, help="Use offline fake OpenAI/Gemini providers"),
+        fake_first_token_ms: float = typer.Option(200, help="Time to first token of the fake providers"),
+        fake_per_token_ms: float = typer.Option(10, help="Per-token latency of the fake providers"),
+        chart: Optional[Path] = typer.Option(None, help="Save latency/throughput charts to this image file"),
+        results_csv: Optional[Path] = typer.Option(None, help="Save raw per-call samples to this CSV file")
+    ):
+        """
+        Measure latency percentiles, time to first token and throughput per model.
+        """
+        models = model or list(MODEL_INFO)
+        unknown = [name for name in models if name not in MODEL_INFO]
+        if unknown:
+            console.print(f"[bold red]Error:[/] Unknown model(s): {', '.join(unknown)}")
+            raise typer.Exit(1)
+        if fake_providers:
+            install_fake_providers(fake_first_token_ms, fake_per_token_ms)
+        asyncio.run(benchmark_models(models, prompt or BENCHMARK_PROMPTS, runs, warmup_runs, chart, results_csv))
+    
+    @app.command()
+    def hf_report(
+        model: str = typer.Option("TinyLlama-1.1B-Chat", help="Local model to report on"),
+        mode: Optional[list[CPUMode]] = typer.Option(None, help="CPU mode to compare with fp32 (repeatable, default: int8 and bf16)"),
+        include_compile: bool = typer.Option(False, "--compile", help="Also measure each mode under torch.compile"),
+        max_new_tokens: int = typer.Option(50, help="Tokens generated per prompt"),
+        threads: Optional[int] = typer.Option(None, help="Intra-op threads for torch")
+    ):
+        """
+        Compare speed and accuracy of CPU inference modes against fp32.
+        """
+        if model not in HF_MODEL_IDS:
+            console.print(f"[bold red]Error:[/] {model} is not a local model")
+            raise typer.Exit(1)
+        cpu_mode_report(model, mode or [CPUMode.INT8, CPUMode.BF16], include_compile, max_new_tokens, threads)
     
     app() 
\ No newline at end of file
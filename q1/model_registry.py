@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+@dataclass
+class LoadedModel:
+    """A tokenizer/model pair kept resident by the registry."""
+    name: str
+    tokenizer: object
+    model: object
+    size_bytes: int
+    load_seconds: float
+
+
+@dataclass
+class RegistryStats:
+    """Counters describing how the registry cache behaved."""
+    loads: int = 0
+    evictions: int = 0
+    hits: int = 0
+    misses: int = 0
+
+
+def load_hf_model(model_id: str) -> tuple[object, object]:
+    """Load a HuggingFace causal LM and its tokenizer from disk or the hub."""
+    from transformers import AutoTokenizer, AutoModelForCausalLM
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    model = AutoModelForCausalLM.from_pretrained(model_id)
+    model.eval()
+    return tokenizer, model
+
+
+def estimate_model_bytes(model) -> int:
+    """Estimate the resident size of a torch model from its state dict.
+
+    The state dict (rather than `parameters()`) also covers the packed weights
+    of quantized layers.
+    """
+    def tensor_bytes(value) -> int:
+        if isinstance(value, (tuple, list)):
+            return sum(tensor_bytes(item) for item in value)
+        if hasattr(value, "numel") and hasattr(value, "element_size"):
+            return value.numel() * value.element_size()
+        return 0
+
+    return sum(tensor_bytes(value) for value in model.state_dict().values())
+
+
+class ModelRegistry:
+    """Load each local model once and keep it resident, evicting LRU models over a RAM budget."""
+
+    def __init__(self, ram_budget_bytes: Optional[int] = None):
+        self.ram_budget_bytes = ram_budget_bytes
+        self.stats = RegistryStats()
+        self._specs: dict[str, tuple[str, Callable, Optional[int]]] = {}
+        self._loaded: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._evict_listeners: list[Callable[[LoadedModel], None]] = []
+        self._lock = threading.RLock()
+
+    def register(
+        self,
+        name: str,
+        model_id: str,
+        loader: Callable[[str], tuple[object, object]] = load_hf_model,
+        size_hint_bytes: Optional[int] = None,
+    ):
+        """Register a local model under `name` without loading it."""
+        with self._lock:
+            self._specs[name] = (model_id, loader, size_hint_bytes)
+
+    def add_evict_listener(self, listener: Callable[[LoadedModel], None]):
+        """Call `listener` with each model as it is evicted, to release anything built on it."""
+        self._evict_listeners.append(listener)
+
+    def is_loaded(self, name: str) -> bool:
+        with self._lock:
+            return name in self._loaded
+
+    @property
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(entry.size_bytes for entry in self._loaded.values())
+
+    def get(self, name: str) -> LoadedModel:
+        """Return the resident model for `name`, loading it on first use."""
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                self.stats.hits += 1
+                return self._loaded[name]
+
+            if name not in self._specs:
+                raise ValueError(f"Local model '{name}' is not registered")
+
+            self.stats.misses += 1
+            model_id, loader, size_hint = self._specs[name]
+
+            # Make room up front when we know roughly how big the model is,
+            # so peak memory stays under the budget during the load.
+            if size_hint:
+                self._evict_to_fit(size_hint)
+
+            start = time.perf_counter()
+            tokenizer, model = loader(model_id)
+            entry = LoadedModel(
+                name=name,
+                tokenizer=tokenizer,
+                model=model,
+                size_bytes=estimate_model_bytes(model),
+                load_seconds=time.perf_counter() - start,
+            )
+            self._loaded[name] = entry
+            self.stats.loads += 1
+            self._evict_to_fit(0, keep=name)
+            return entry
+
+    def warm_up(self, names: Optional[list[str]] = None) -> list[LoadedModel]:
+        """Load the given (or all registered) models ahead of the first prompt."""
+        with self._lock:
+            targets = names if names is not None else list(self._specs)
+        return [self.get(name) for name in targets]
+
+    def evict(self, name: str) -> bool:
+        """Drop a resident model so its memory can be reclaimed."""
+        with self._lock:
+            entry = self._loaded.pop(name, None)
+            if entry is None:
+                return False
+            self.stats.evictions += 1
+        for listener in self._evict_listeners:
+            listener(entry)
+        return True
+
+    def _evict_to_fit(self, incoming_bytes: int, keep: Optional[str] = None):
+        if self.ram_budget_bytes is None:
+            return
+        while self.resident_bytes + incoming_bytes > self.ram_budget_bytes:
+            victims = [name for name in self._loaded if name != keep]
+            if not victims:
+                # A single model larger than the budget is still allowed to load.
+                return
+            self.evict(victims[0])
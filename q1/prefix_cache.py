@@ -0,0 +1,159 @@
+import copy
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass
+class PrefillStats:
+    """How much prompt processing was reused from cached key/values versus computed."""
+    prefix_builds: int = 0
+    prefix_build_seconds: float = 0.0
+    generations: int = 0
+    reused_tokens: int = 0
+    computed_tokens: int = 0
+    prefill_seconds: float = 0.0
+
+    @property
+    def reuse_rate(self) -> float:
+        total = self.reused_tokens + self.computed_tokens
+        return self.reused_tokens / total if total else 0.0
+
+
+def cached_length(cache) -> int:
+    """Number of positions held by a key/value cache (Cache object or legacy tuples)."""
+    if hasattr(cache, "get_seq_length"):
+        return cache.get_seq_length()
+    return cache[0][0].shape[2]
+
+
+def _generate_from_cache(model, tokenizer, cache, history_ids, new_ids, stats: PrefillStats, **generation_kwargs):
+    """Generate a continuation of `history_ids` + `new_ids`, reusing `cache` for the start of it.
+
+    Whatever `cache` doesn't cover yet is prefilled explicitly, except for the
+    last prompt token which `generate` needs as its starting point, so prefill
+    cost can be measured on its own. `cache` is extended in place.
+    """
+    import torch
+
+    input_ids = torch.cat([history_ids, new_ids], dim=1)
+    reused = cached_length(cache)
+    start = time.perf_counter()
+    with torch.no_grad():
+        if input_ids.shape[1] - reused > 1:
+            model(input_ids[:, reused:-1], past_key_values=cache, use_cache=True)
+        stats.prefill_seconds += time.perf_counter() - start
+        stats.reused_tokens += reused
+        stats.computed_tokens += input_ids.shape[1] - reused
+        stats.generations += 1
+
+        outputs = model.generate(
+            input_ids,
+            attention_mask=torch.ones_like(input_ids),
+            past_key_values=cache,
+            pad_token_id=tokenizer.pad_token_id,
+            eos_token_id=tokenizer.eos_token_id,
+            **generation_kwargs,
+        )
+    return input_ids, outputs[0][input_ids.shape[1]:]
+
+
+class PrefixCache:
+    """Key/value cache for a fixed prompt prefix (e.g. the system prompt), computed once.
+
+    Every generation starts from a copy of the cached prefix, so only the
+    text after the prefix has to be prefilled.
+    """
+
+    def __init__(self, tokenizer, model, prefix_text: str):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.prefix_text = prefix_text
+        self.stats = PrefillStats()
+        self._prefix_ids = None
+        self._cache = None
+        self._lock = threading.Lock()
+
+    def encode_suffix(self, text: str):
+        return self.tokenizer(text, return_tensors="pt", add_special_tokens=False)["input_ids"]
+
+    def prefix(self):
+        """Return (prefix ids, a private copy of the prefix cache), building it on first use."""
+        import torch
+
+        with self._lock:
+            if self._cache is None:
+                start = time.perf_counter()
+                self._prefix_ids = self.tokenizer(
+                    self.prefix_text, return_tensors="pt", add_special_tokens=True
+                )["input_ids"]
+                with torch.no_grad():
+                    self._cache = self.model(self._prefix_ids, use_cache=True).past_key_values
+                self.stats.prefix_builds += 1
+                self.stats.prefix_build_seconds += time.perf_counter() - start
+            return self._prefix_ids, copy.deepcopy(self._cache)
+
+    def generate(self, suffix_text: str, **generation_kwargs) -> tuple[str, int, int]:
+        """Generate a response to prefix + `suffix_text`.
+
+        Returns (response, prompt token count, generated token count).
+        """
+        prefix_ids, cache = self.prefix()
+        input_ids, new_tokens = _generate_from_cache(
+            self.model, self.tokenizer, cache, prefix_ids, self.encode_suffix(suffix_text),
+            self.stats, **generation_kwargs
+        )
+        response = self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+        return response.strip(), input_ids.shape[1], len(new_tokens)
+
+
+class ChatSession:
+    """A multi-turn conversation that keeps the key/values of every previous turn.
+
+    Each turn only prefills the new user message; the system prompt and
+    earlier turns come from the cache. When the conversation would no longer
+    fit in the context window it starts over from the system prompt.
+    """
+
+    def __init__(self, prefix_cache: PrefixCache, context_window: int, generation_kwargs: dict):
+        self.prefix_cache = prefix_cache
+        self.context_window = context_window
+        self.generation_kwargs = generation_kwargs
+        self.turns = 0
+        self._history_ids = None
+        self._cache = None
+
+    def reset(self):
+        self.turns = 0
+        self._history_ids = None
+        self._cache = None
+
+    def send(self, turn_text: str) -> tuple[str, int, bool]:
+        """Continue the conversation; returns (response, token count, whether history was reset)."""
+        import torch
+
+        tokenizer = self.prefix_cache.tokenizer
+        new_ids = self.prefix_cache.encode_suffix(turn_text)
+        was_reset = False
+        if self._history_ids is not None:
+            max_new_tokens = self.generation_kwargs.get("max_new_tokens", 0)
+            needed = self._history_ids.shape[1] + new_ids.shape[1] + max_new_tokens
+            if needed > self.context_window:
+                self.reset()
+                was_reset = True
+        if self._history_ids is None:
+            self._history_ids, self._cache = self.prefix_cache.prefix()
+
+        input_ids, new_tokens = _generate_from_cache(
+            self.prefix_cache.model, tokenizer, self._cache, self._history_ids, new_ids,
+            self.prefix_cache.stats, **self.generation_kwargs
+        )
+
+        # Close the assistant turn so the next user turn follows the chat format
+        if len(new_tokens) == 0 or new_tokens[-1].item() != tokenizer.eos_token_id:
+            new_tokens = torch.cat([new_tokens, torch.tensor([tokenizer.eos_token_id])])
+        self._history_ids = torch.cat([input_ids, new_tokens.unsqueeze(0)], dim=1)
+        self.turns += 1
+
+        response = tokenizer.decode(new_tokens, skip_special_tokens=True)
+        return response.strip(), input_ids.shape[1] + len(new_tokens), was_reset
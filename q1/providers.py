@@ -0,0 +1,56 @@
+import threading
+from typing import Callable, Optional
+
+
+class LazyProvider:
+    """A provider backend whose SDK import and client construction happen on first use.
+
+    `factory` does the heavy work (importing the SDK, reading the API key,
+    building the client) and may return None when the provider is not
+    configured. The result is built once and shared by every caller.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Optional[object]]):
+        self.name = name
+        self._factory = factory
+        self._client = None
+        self._built = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._built
+
+    def get(self) -> Optional[object]:
+        """Return the client, building it if this is the first call."""
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self._client = self._factory()
+                    self._built = True
+        return self._client
+
+    def override(self, client: object):
+        """Use `client` instead of building one, e.g. an offline fake."""
+        with self._lock:
+            self._client = client
+            self._built = True
+
+
+class ProviderRegistry:
+    """Maps provider names to their lazily built clients."""
+
+    def __init__(self):
+        self._providers: dict[str, LazyProvider] = {}
+
+    def register(self, name: str, factory: Callable[[], Optional[object]]) -> LazyProvider:
+        provider = LazyProvider(name, factory)
+        self._providers[name] = provider
+        return provider
+
+    def __getitem__(self, name: str) -> LazyProvider:
+        return self._providers[name]
+
+    def loaded(self) -> list[str]:
+        """Names of providers whose clients have been built so far."""
+        return [name for name, provider in self._providers.items() if provider.loaded]
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class CacheStats:
+    """Counters describing how the response cache behaved during a run."""
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def cache_key(provider: str, model: str, prompt: str, params: dict) -> str:
+    """Build a stable key from everything that influences a model response."""
+    payload = json.dumps(
+        {"provider": provider, "model": model, "prompt": prompt, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed cache of model responses with TTL and size-bounded LRU eviction.
+
+    `bypass` skips the cache entirely; `refresh` skips lookups but still
+    stores fresh responses, overwriting whatever was cached before.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.bypass = False
+        self.refresh = False
+        self.stats = CacheStats()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened on first use so runs that never touch the cache don't create the file
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                # v2 allows NULL tokens for streams whose usage was never reported
+                """CREATE TABLE IF NOT EXISTS responses_v2 (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    tokens INTEGER,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_v2_accessed_at ON responses_v2 (accessed_at)"
+            )
+        return self._conn
+
+    def get(self, provider: str, model: str, prompt: str, params: dict) -> Optional[tuple[str, Optional[int]]]:
+        """Return a cached (response, tokens) pair, or None on a miss. Tokens may be None if unknown."""
+        if self.bypass or self.refresh:
+            return None
+
+        key = cache_key(provider, model, prompt, params)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT response, tokens, created_at FROM responses_v2 WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl_seconds is not None and now - row[2] > self.ttl_seconds:
+                conn.execute("DELETE FROM responses_v2 WHERE key = ?", (key,))
+                conn.commit()
+                self.stats.expired += 1
+                row = None
+
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            conn.execute("UPDATE responses_v2 SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.stats.hits += 1
+            return row[0], row[1]
+
+    def put(self, provider: str, model: str, prompt: str, params: dict, response: str, tokens: Optional[int]):
+        """Store a response and evict the least recently used entries over `max_entries`."""
+        if self.bypass:
+            return
+
+        key = cache_key(provider, model, prompt, params)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses_v2 VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, provider, model, response, tokens, now, now),
+            )
+            self.stats.writes += 1
+
+            if self.max_entries is not None:
+                cursor = conn.execute(
+                    """DELETE FROM responses_v2 WHERE key IN (
+                        SELECT key FROM responses_v2 ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,),
+                )
+                self.stats.evictions += cursor.rowcount
+            conn.commit()
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._connection().execute("DELETE FROM responses_v2")
+            self._connection().commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
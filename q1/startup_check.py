@@ -0,0 +1,71 @@
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import typer
+from rich.console import Console
+
+console = Console()
+
+SCRIPT = Path(__file__).with_name("model_comparison.py")
+
+# Modules that must only be imported once a provider actually needs them
+HEAVY_MODULES = ["torch", "transformers", "openai", "google.generativeai", "pandas", "matplotlib"]
+
+
+def measure_cold_start(args: list[str], runs: int) -> list[float]:
+    """Time fresh interpreter runs of model_comparison.py with the given arguments."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(SCRIPT), *args], capture_output=True, cwd=SCRIPT.parent)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def heavy_modules_on_import() -> list[str]:
+    """Return the heavy modules that get imported just by importing model_comparison."""
+    code = (
+        "import sys, json, model_comparison; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=SCRIPT.parent, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(
+    runs: int = typer.Option(5, help="Number of cold starts to time"),
+    max_seconds: float = typer.Option(1.0, help="Fail if the median cold start is slower than this"),
+):
+    """
+    Guard against CLI startup regressions: time `model_comparison.py --help`
+    cold starts and check that no provider SDK is imported eagerly.
+    """
+    timings = measure_cold_start(["--help"], runs)
+    median = statistics.median(timings)
+    console.print(
+        f"[bold cyan]Cold start:[/] median {median:.3f}s, "
+        f"min {min(timings):.3f}s, max {max(timings):.3f}s over {runs} runs"
+    )
+
+    eager = heavy_modules_on_import()
+    failed = False
+    if eager:
+        console.print(f"[bold red]Eagerly imported:[/] {', '.join(eager)}")
+        failed = True
+    if median > max_seconds:
+        console.print(f"[bold red]Startup regression:[/] median {median:.3f}s exceeds {max_seconds:.3f}s")
+        failed = True
+
+    if failed:
+        raise typer.Exit(1)
+    console.print("[bold green]Startup time OK[/]")
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,81 @@
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+
+@dataclass
+class StreamChunk:
+    """A piece of streamed output; token counts are set once the provider reports usage."""
+    text: str = ""
+    tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+@dataclass
+class StreamMetrics:
+    """Timing of a streamed response, measured from when the request was sent."""
+    start: float = field(default_factory=time.perf_counter)
+    arrivals: list[float] = field(default_factory=list)
+    total: Optional[float] = None
+
+    def record(self):
+        """Note that a non-empty chunk just arrived."""
+        self.arrivals.append(time.perf_counter())
+
+    def finish(self):
+        self.total = time.perf_counter() - self.start
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Time to first token."""
+        return self.arrivals[0] - self.start if self.arrivals else None
+
+    @property
+    def inter_token_latencies(self) -> list[float]:
+        return [later - earlier for earlier, later in zip(self.arrivals, self.arrivals[1:])]
+
+    @property
+    def mean_itl(self) -> Optional[float]:
+        gaps = self.inter_token_latencies
+        return statistics.mean(gaps) if gaps else None
+
+    @property
+    def max_itl(self) -> Optional[float]:
+        gaps = self.inter_token_latencies
+        return max(gaps) if gaps else None
+
+
+_DONE = object()
+
+
+async def iterate_in_thread(make_iterator: Callable[[], Iterator]) -> AsyncIterator:
+    """Consume a blocking iterator (e.g. an SDK stream) in a worker thread.
+
+    Items are handed back to the event loop as they arrive, so several
+    streams can be rendered at the same time.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def produce():
+        try:
+            for item in make_iterator():
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        await producer
@@ -0,0 +1,46 @@
+from pathlib import Path
+from typing import Optional
+
+
+def _pyplot(headless: bool):
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def plot_token_usage(results: list[dict], path: Optional[Path] = None):
+    """Bar chart of token usage per model; shown in a window unless `path` is given."""
+    plt = _pyplot(headless=path is not None)
+    ok = [result for result in results if not result.get("error") and result.get("tokens")]
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bar([result["model"] for result in ok], [result["tokens"] for result in ok], color="tab:blue")
+    ax.set_ylabel("Tokens")
+    ax.set_title("Token Usage by Model")
+    fig.tight_layout()
+    _finish(plt, fig, path)
+
+
+def plot_benchmark(summary, path: Optional[Path] = None):
+    """Plot latency percentiles, time to first token and throughput from a benchmark summary."""
+    plt = _pyplot(headless=path is not None)
+    fig, axes = plt.subplots(1, 3, figsize=(15, 4))
+
+    summary[["p50_latency", "p95_latency", "p99_latency"]].plot.bar(ax=axes[0], rot=15)
+    axes[0].set_title("Latency (s)")
+    summary[["p50_ttft", "p95_ttft"]].plot.bar(ax=axes[1], rot=15)
+    axes[1].set_title("Time to first token (s)")
+    summary[["tokens_per_sec"]].plot.bar(ax=axes[2], rot=15, legend=False)
+    axes[2].set_title("Output tokens/sec")
+
+    fig.tight_layout()
+    _finish(plt, fig, path)
+
+
+def _finish(plt, fig, path: Optional[Path]):
+    if path is not None:
+        fig.savefig(path)
+        plt.close(fig)
+    else:
+        plt.show()
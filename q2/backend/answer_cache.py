@@ -0,0 +1,266 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class AnswerCacheStats:
+    """Lookup counters for the answer cache."""
+    exact_hits: int = 0
+    similar_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    expired: int = 0
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.exact_hits + self.similar_hits
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def report(self) -> dict:
+        return {
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "writes": self.writes,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+@dataclass
+class CachedAnswer:
+    key: str
+    question: str
+    dhash: int
+    width: int
+    height: int
+    answer: str
+    created_at: float
+
+
+def normalize_question(question: str) -> str:
+    """Fold case, whitespace and trailing punctuation so trivially different questions match."""
+    return " ".join(question.lower().split()).rstrip("?.! ")
+
+
+def content_key(image_bytes: bytes, question: str) -> str:
+    """Key an answer by the exact uploaded bytes and the normalized question."""
+    digest = hashlib.sha256(image_bytes)
+    digest.update(b"\0" + normalize_question(question).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def is_distinctive(dhash: int, hash_bits: int) -> bool:
+    """Whether a hash carries enough detail to tell images apart.
+
+    Mostly uniform images (documents, screenshots, blank areas) have almost
+    no brightness gradients, so their hashes are nearly all zeros or all ones
+    and unrelated images end up within a few bits of each other.
+    """
+    ones = bin(dhash).count("1")
+    return hash_bits // 8 <= ones <= hash_bits - hash_bits // 8
+
+
+def same_shape(a_width: int, a_height: int, b_width: int, b_height: int, tolerance: float = 0.02) -> bool:
+    """Whether two images have the same aspect ratio, as resized copies do."""
+    if not (a_height and b_height):
+        return False
+    a_ratio, b_ratio = a_width / a_height, b_width / b_height
+    return abs(a_ratio - b_ratio) <= tolerance * max(a_ratio, b_ratio)
+
+
+# Hashes are wider than SQLite's 64-bit integers, so they are stored as hex text
+_COLUMNS = "key, question, dhash, width, height, answer, created_at"
+
+
+def _from_row(row) -> CachedAnswer:
+    key, question, dhash, width, height, answer, created_at = row
+    return CachedAnswer(key, question, int(dhash, 16), width, height, answer, created_at)
+
+
+class AnswerCache:
+    """Two-tier cache of answers keyed by image content and question.
+
+    Exact uploads are found by content hash before the image is even decoded.
+    With `max_distance` > 0, resized or re-encoded copies are also found
+    afterwards by comparing `hash_bits`-bit perceptual hashes of the normalized
+    image among answers to the same question, accepting only images with the
+    same aspect ratio and hashes distinctive enough to compare. Entries live
+    in an in-memory LRU and, when `disk_path` is set, in a SQLite file that
+    survives restarts. Every write drops expired rows from the file and the
+    oldest rows beyond `max_disk_entries`.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_disk_entries: Optional[int] = 10000,
+        ttl_seconds: Optional[float] = None,
+        disk_path: Optional[Path] = None,
+        max_distance: int = 0,
+        hash_bits: int = 256,
+    ):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_path = Path(disk_path) if disk_path else None
+        self.max_distance = max_distance
+        self.hash_bits = hash_bits
+        self.stats = AnswerCacheStats()
+        self._memory: "OrderedDict[str, CachedAnswer]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if self.disk_path is None:
+            return None
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.disk_path, check_same_thread=False)
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS answers_v2 (
+                    key TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    dhash TEXT NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    answer TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_v2_question ON answers_v2 (question)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS answers_v2_created_at ON answers_v2 (created_at)")
+        return self._conn
+
+    def _is_expired(self, entry: CachedAnswer, now: float) -> bool:
+        return self.ttl_seconds is not None and now - entry.created_at > self.ttl_seconds
+
+    def _remember(self, entry: CachedAnswer):
+        self._memory[entry.key] = entry
+        self._memory.move_to_end(entry.key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
+
+    def _forget(self, key: str):
+        self._memory.pop(key, None)
+        conn = self._connection()
+        if conn is not None:
+            conn.execute("DELETE FROM answers_v2 WHERE key = ?", (key,))
+            conn.commit()
+        self.stats.expired += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the answer stored for exactly this image and question."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                conn = self._connection()
+                row = conn.execute(
+                    f"SELECT {_COLUMNS} FROM answers_v2 WHERE key = ?", (key,)
+                ).fetchone() if conn is not None else None
+                if row is not None:
+                    entry = _from_row(row)
+                    self.stats.disk_hits += 1
+
+            if entry is not None and self._is_expired(entry, now):
+                self._forget(key)
+                entry = None
+            if entry is None:
+                return None
+
+            self._remember(entry)
+            self.stats.exact_hits += 1
+            return entry.answer
+
+    def get_similar(self, dhash: int, question: str, width: int, height: int) -> Optional[str]:
+        """Return an answer to the same question about a perceptually near-identical image."""
+        if self.max_distance <= 0 or not is_distinctive(dhash, self.hash_bits):
+            with self._lock:
+                self.stats.misses += 1
+            return None
+
+        question = normalize_question(question)
+        now = time.time()
+        with self._lock:
+            best = None
+            candidates = [entry for entry in self._memory.values() if entry.question == question]
+            conn = self._connection()
+            if conn is not None:
+                rows = conn.execute(
+                    f"SELECT {_COLUMNS} FROM answers_v2 WHERE question = ?", (question,)
+                ).fetchall()
+                candidates += [_from_row(row) for row in rows if row[0] not in self._memory]
+
+            for entry in candidates:
+                if self._is_expired(entry, now):
+                    continue
+                if not same_shape(entry.width, entry.height, width, height):
+                    continue
+                if not is_distinctive(entry.dhash, self.hash_bits):
+                    continue
+                distance = hamming_distance(entry.dhash, dhash)
+                if distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, entry)
+
+            if best is None:
+                self.stats.misses += 1
+                return None
+
+            entry = best[1]
+            if entry.key not in self._memory:
+                self.stats.disk_hits += 1
+            self._remember(entry)
+            self.stats.similar_hits += 1
+            return entry.answer
+
+    def put(self, key: str, question: str, dhash: int, width: int, height: int, answer: str):
+        entry = CachedAnswer(key, normalize_question(question), dhash, width, height, answer, time.time())
+        with self._lock:
+            self._remember(entry)
+            conn = self._connection()
+            if conn is not None:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO answers_v2 ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry.key, entry.question, format(entry.dhash, "x"), entry.width, entry.height,
+                     entry.answer, entry.created_at),
+                )
+                if self.ttl_seconds is not None:
+                    cursor = conn.execute(
+                        "DELETE FROM answers_v2 WHERE created_at < ?", (entry.created_at - self.ttl_seconds,)
+                    )
+                    self.stats.expired += cursor.rowcount
+                if self.max_disk_entries is not None:
+                    cursor = conn.execute(
+                        """DELETE FROM answers_v2 WHERE key IN (
+                            SELECT key FROM answers_v2 ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                        )""",
+                        (self.max_disk_entries,),
+                    )
+                    self.stats.evictions += cursor.rowcount
+                conn.commit()
+            self.stats.writes += 1
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
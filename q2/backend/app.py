@@ -1,15 +1,34 @@
-from fastapi import FastAPI, UploadFile, Form, HTTPException
+from fastapi import FastAPI, Request, UploadFile, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import google.generativeai as genai
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import asyncio
+import json
+import logging
+import math
 import os
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+try:
+    from llm_client import RateLimited, gemini_model, shared_client
+except ImportError:
+    # Not installed with `pip install -e .`; use the checkout's copy at the repository root
+    sys.path.append(str(Path(__file__).resolve().parents[2]))
+    from llm_client import RateLimited, gemini_model, shared_client
 from dotenv import load_dotenv
-from PIL import Image
-import io
+from image_pipeline import HASH_SIZE, ImagePipeline, PreprocessedImage
+from call_limiter import CallLimiter, Overloaded
+from answer_cache import AnswerCache, content_key
+from upload_reader import UploadRejected, read_upload
+from metrics import MetricsRegistry, record_timing, request_timings, server_timing_header, timed
 
 # Load environment variables
 load_dotenv()
 
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+logger = logging.getLogger("multimodal_qa")
+
 # Initialize FastAPI app
 app = FastAPI()
 
@@ -22,54 +41,432 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure Gemini API
+# Configure Gemini API. Without a key the server still starts, but /health
+# reports it as not ready and analysis requests get a 503. Calls go through
+# the shared llm_client, which adds timeouts, rate limits and retries
+# (configured with the LLM_* environment variables).
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    raise ValueError("GOOGLE_API_KEY environment variable not set")
+model = None
+if GOOGLE_API_KEY:
+    # Initialize the Gemini multimodal model
+    model = gemini_model('gemini-1.5-flash', GOOGLE_API_KEY)
+else:
+    logger.warning("GOOGLE_API_KEY environment variable not set")
+
+# Request instrumentation, served on /metrics
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    "analyze_stage_seconds", "Time spent in each stage of handling an analysis request", labels=("stage",)
+)
+request_seconds = metrics.histogram(
+    "http_request_duration_seconds", "Time to produce a response, by route", labels=("route",)
+)
+requests_total = metrics.counter("http_requests_total", "Responses sent, by route and status", labels=("route", "status"))
+errors_total = metrics.counter("analyze_errors_total", "Failed analysis requests, by kind", labels=("kind",))
+requests_in_flight = 0
+metrics.gauge("http_requests_in_flight", "Requests currently being handled", lambda: requests_in_flight)
+
+# Uploads are downsized and re-encoded before they are sent to Gemini
+image_pipeline = ImagePipeline(
+    max_side=int(os.getenv("IMAGE_MAX_SIDE", "1536")),
+    fmt=os.getenv("IMAGE_FORMAT", "WEBP"),
+    quality=int(os.getenv("IMAGE_QUALITY", "85")),
+    workers=int(os.getenv("IMAGE_WORKERS", "0")) or None,
+)
+
+# Gemini calls block, so they run in a dedicated thread pool behind an
+# in-flight limit and a bounded wait queue
+model_limiter = CallLimiter(
+    max_in_flight=int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT", "30")),
+    on_timing=lambda stage, seconds: record_timing(stage_seconds, stage, seconds),
+)
+metrics.gauge("model_calls_in_flight", "Gemini calls currently running", lambda: model_limiter.in_flight)
+metrics.gauge("model_queue_depth", "Gemini calls waiting for a free slot", lambda: model_limiter.waiting)
+metrics.gauge(
+    "model_calls_rejected_total", "Gemini calls refused because the queue was full",
+    lambda: model_limiter.stats.rejected, kind="counter"
+)
+metrics.gauge(
+    "model_calls_timed_out_total", "Gemini calls that waited too long for a slot",
+    lambda: model_limiter.stats.timed_out, kind="counter"
+)
+metrics.gauge(
+    "model_call_retries_total", "Gemini calls retried after a rate-limit or transient error",
+    lambda: shared_client().total("retries"), kind="counter"
+)
+metrics.gauge(
+    "model_calls_coalesced_total", "Gemini calls that shared an identical in-flight call's result",
+    lambda: shared_client().total("coalesced"), kind="counter"
+)
+metrics.gauge(
+    "model_rate_limit_wait_seconds_total", "Time Gemini calls spent waiting for rate-limit budget",
+    lambda: shared_client().total("rate_limit_wait"), kind="counter"
+)
+
+# Answers are reused for the same image and the same question. Setting
+# ANSWER_CACHE_MAX_DISTANCE also reuses them for resized/re-encoded copies.
+# ANSWER_CACHE_PATH adds a disk tier that survives restarts.
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024")),
+    max_disk_entries=int(os.getenv("ANSWER_CACHE_MAX_DISK_ENTRIES", "10000")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_HOURS", "24")) * 3600,
+    disk_path=os.getenv("ANSWER_CACHE_PATH") or None,
+    max_distance=int(os.getenv("ANSWER_CACHE_MAX_DISTANCE", "0")),
+    hash_bits=HASH_SIZE * HASH_SIZE,
+)
+metrics.gauge("answer_cache_hits_total", "Answers served from the cache", lambda: answer_cache.stats.hits, kind="counter")
+metrics.gauge(
+    "answer_cache_misses_total", "Cache lookups that needed a model call",
+    lambda: answer_cache.stats.misses, kind="counter"
+)
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    image_pipeline.close()
+    model_limiter.close()
+    answer_cache.close()
+
+# Uploads are read in chunks and rejected as soon as they pass this size
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "20")) * 1024 * 1024)
+BATCH_MAX_ITEMS = int(os.getenv("ANALYZE_BATCH_MAX_ITEMS", "16"))
+# Room for the question and multipart framing on top of the image itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def reject_oversize_requests(request: Request, call_next):
+    """Turn away bodies that declare a size over the limit before they are parsed."""
+    content_length = request.headers.get("content-length")
+    if request.method == "POST" and content_length and content_length.isdigit():
+        images = BATCH_MAX_ITEMS if request.url.path == "/analyze/batch" else 1
+        if int(content_length) > images * UPLOAD_MAX_BYTES + FORM_OVERHEAD_BYTES:
+            return JSONResponse(
+                {"answer": f"Upload is larger than the {UPLOAD_MAX_BYTES} byte limit", "success": False},
+                status_code=413,
+            )
+    return await call_next(request)
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Time every request and report its stage timings in a Server-Timing header."""
+    global requests_in_flight
+    timings = {}
+    request_timings.set(timings)
+    requests_in_flight += 1
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        requests_in_flight -= 1
+    elapsed = time.perf_counter() - start
+
+    # Label by route template rather than raw path to keep cardinality bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    request_seconds.observe(elapsed, route=route)
+    requests_total.inc(route=route, status=response.status_code)
+    # Streamed responses send their headers before the model has finished,
+    # so only the stages completed by then are included
+    response.headers["Server-Timing"] = server_timing_header({**timings, "total": elapsed})
+    # The frontend runs on another origin; without this the browser hides the timings
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+def log_analysis_error(e: Exception):
+    errors_total.inc(kind="analysis_failed")
+    logger.warning("Image analysis error: %s", e)
+
+def ensure_model_configured():
+    if model is None:
+        errors_total.inc(kind="not_configured")
+        raise HTTPException(status_code=503, detail="Gemini is not configured; set GOOGLE_API_KEY")
+
+def rejected_response(e: UploadRejected) -> JSONResponse:
+    errors_total.inc(kind="upload_rejected")
+    return JSONResponse({"answer": str(e), "success": False}, status_code=e.status_code)
+
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    errors_total.inc(kind="overloaded")
+    return JSONResponse(
+        {"answer": str(e), "success": False},
+        status_code=503,
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+def build_contents(processed, question: str) -> list:
+    # Prompt (text comes after the image)
+    prompt = f"Please answer this question about the image: {question}"
+    return [{"mime_type": processed.mime_type, "data": processed.data}, prompt]
+
+def chunk_text(chunk) -> str:
+    # Chunks without candidate parts (e.g. safety stops) raise on .text
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def preprocess_image(image_content: bytes) -> PreprocessedImage:
+    # Validate, downsize and strip the image in a worker process
+    with timed(stage_seconds, "preprocess"):
+        processed = await image_pipeline.process(image_content)
+    logger.info(
+        "Preprocessed image: %d -> %d bytes in %.1fms",
+        processed.original_bytes, processed.processed_bytes, processed.seconds * 1000
+    )
+    return processed
+
+async def prepare_image(
+    image_content: bytes,
+    question: str,
+    preprocess: Optional[Callable[[], Awaitable[PreprocessedImage]]] = None,
+):
+    """Return (cache key, cached answer or None, preprocessed image or None).
+
+    Exact repeats are answered without decoding the image at all; otherwise
+    the image is preprocessed (by `preprocess` when given) and checked
+    against near-duplicates.
+    """
+    # Hashing the upload and the cache's SQLite tier both block, so they run
+    # in a worker thread rather than on the event loop
+    def lookup_exact():
+        key = content_key(image_content, question)
+        return key, answer_cache.get(key)
+
+    key, answer = await asyncio.to_thread(lookup_exact)
+    if answer is not None:
+        return key, answer, None
 
-genai.configure(api_key=GOOGLE_API_KEY)
+    processed = await (preprocess() if preprocess else preprocess_image(image_content))
+    similar = await asyncio.to_thread(
+        answer_cache.get_similar, processed.dhash, question, processed.width, processed.height
+    )
+    return key, similar, processed
 
-# Initialize the Gemini multimodal model
-model = genai.GenerativeModel('gemini-1.5-flash')
+async def store_answer(key: str, question: str, processed: PreprocessedImage, answer: str):
+    await asyncio.to_thread(
+        answer_cache.put, key, question, processed.dhash, processed.width, processed.height, answer
+    )
+
+async def ask_model(key: str, processed: PreprocessedImage, question: str) -> str:
+    """Ask Gemini about a preprocessed image and cache the answer."""
+    try:
+        response = await model_limiter.run(
+            model.generate_content,
+            contents=build_contents(processed, question),
+            stream=False
+        )
+    except RateLimited as e:
+        raise Overloaded("Gemini rate limit reached; try again shortly", retry_after=math.ceil(e.retry_after))
+    await store_answer(key, question, processed, response.text)
+    return response.text
 
 @app.post("/analyze")
 async def analyze_image(
     image: UploadFile,
     question: str = Form(...),
 ):
+    ensure_model_configured()
     try:
-        # Read image content
-        image_content = await image.read()
+        # Reject before reading the upload if the model queue is already full
+        model_limiter.check_capacity()
 
-        # Load and validate the image
-        img = Image.open(io.BytesIO(image_content))
-        if img.mode != "RGB":
-            img = img.convert("RGB")
+        # Read image content
+        with timed(stage_seconds, "upload_read"):
+            image_content = await read_upload(image, UPLOAD_MAX_BYTES)
 
-        # Prompt (text comes after the image)
-        prompt = f"Please answer this question about the image: {question}"
+        key, cached, processed = await prepare_image(image_content, question)
+        if cached is not None:
+            return JSONResponse({
+                "answer": cached,
+                "success": True,
+                "cached": True,
+                "image": processed.report() if processed else None
+            })
 
         # Generate multimodal response
-        response = model.generate_content(
-            contents=[
-                {"mime_type": "image/jpeg", "data": image_content},
-                prompt
-            ],
-            stream=False
-        )
+        answer = await ask_model(key, processed, question)
 
         return JSONResponse({
-            "answer": response.text,
-            "success": True
+            "answer": answer,
+            "success": True,
+            "cached": False,
+            "image": processed.report()
         })
 
+    except Overloaded as e:
+        return overloaded_response(e)
+    except UploadRejected as e:
+        return rejected_response(e)
     except Exception as e:
-        print(f"Image analysis error: {e}")
+        log_analysis_error(e)
         return JSONResponse({
             "answer": f"Image analysis failed: {str(e)}",
             "success": False
         })
 
+@app.post("/analyze/stream")
+async def analyze_image_stream(
+    image: UploadFile,
+    question: str = Form(...),
+):
+    """Like /analyze, but forwards the answer as Server-Sent Events while Gemini generates it."""
+    ensure_model_configured()
+    try:
+        model_limiter.check_capacity()
+        with timed(stage_seconds, "upload_read"):
+            image_content = await read_upload(image, UPLOAD_MAX_BYTES)
+        key, cached, processed = await prepare_image(image_content, question)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except UploadRejected as e:
+        return rejected_response(e)
+    except Exception as e:
+        log_analysis_error(e)
+        return JSONResponse({
+            "answer": f"Image analysis failed: {str(e)}",
+            "success": False
+        }, status_code=400)
+
+    async def events():
+        start = time.perf_counter()
+        ttft = None
+        if cached is not None:
+            yield sse_event("chunk", {"text": cached})
+            yield sse_event("done", {
+                "success": True,
+                "cached": True,
+                "image": processed.report() if processed else None,
+                "ttft_ms": 0.0,
+                "total_ms": 0.0,
+            })
+            return
+
+        pieces = []
+        try:
+            chunks = model_limiter.stream(
+                model.generate_content,
+                contents=build_contents(processed, question),
+                stream=True
+            )
+            async for chunk in chunks:
+                text = chunk_text(chunk)
+                if not text:
+                    continue
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                pieces.append(text)
+                yield sse_event("chunk", {"text": text})
+            # An empty stream (e.g. a safety stop) is not an answer worth reusing
+            if pieces:
+                await store_answer(key, question, processed, "".join(pieces))
+            yield sse_event("done", {
+                "success": True,
+                "cached": False,
+                "image": processed.report(),
+                "ttft_ms": round(ttft * 1000, 1) if ttft is not None else None,
+                "total_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+        except Exception as e:
+            log_analysis_error(e)
+            yield sse_event("error", {"message": f"Image analysis failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    images: list[UploadFile],
+    questions: list[str] = Form(...),
+):
+    """Answer many questions about one image, or one question about each of many images.
+
+    Each image is read and preprocessed once however many questions refer to
+    it. Results come back in request order, each with its own status.
+    """
+    if len(images) == 1:
+        items = [(0, question) for question in questions]
+    elif len(questions) == 1:
+        items = [(index, questions[0]) for index in range(len(images))]
+    elif len(images) == len(questions):
+        items = list(enumerate(questions))
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Send one image with several questions, several images with one question, "
+                   "or one question per image",
+        )
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch can hold at most {BATCH_MAX_ITEMS} questions")
+
+    ensure_model_configured()
+    try:
+        model_limiter.check_capacity()
+    except Overloaded as e:
+        return overloaded_response(e)
+
+    try:
+        with timed(stage_seconds, "upload_read"):
+            contents = [await read_upload(image, UPLOAD_MAX_BYTES) for image in images]
+    except UploadRejected as e:
+        return rejected_response(e)
+    preprocessing: dict[int, asyncio.Future] = {}
+
+    def preprocess(index: int) -> Awaitable[PreprocessedImage]:
+        # Questions about the same image share one preprocessing job
+        if index not in preprocessing:
+            preprocessing[index] = asyncio.ensure_future(preprocess_image(contents[index]))
+        return preprocessing[index]
+
+    async def answer_item(index: int, question: str) -> dict:
+        result = {"image": index, "question": question}
+        try:
+            key, cached, processed = await prepare_image(contents[index], question, lambda: preprocess(index))
+            if cached is not None:
+                return {**result, "answer": cached, "success": True, "cached": True}
+            answer = await ask_model(key, processed, question)
+            return {**result, "answer": answer, "success": True, "cached": False}
+        except Overloaded as e:
+            return {**result, "answer": None, "success": False, "error": str(e), "retry_after": e.retry_after}
+        except Exception as e:
+            log_analysis_error(e)
+            return {**result, "answer": None, "success": False, "error": f"Image analysis failed: {str(e)}"}
+
+    results = await asyncio.gather(*(answer_item(index, question) for index, question in items))
+    return JSONResponse({
+        "results": results,
+        "success": all(result["success"] for result in results)
+    })
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return answer_cache.stats.report()
+
+@app.get("/model/stats")
+async def model_stats():
+    """Per-model call, error, retry and latency statistics of the Gemini client."""
+    return shared_client().stats()
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    """Report whether the server can take analysis requests right now."""
+    ready = model is not None and not model_limiter.saturated
+    return JSONResponse({
+        "status": "healthy" if ready else "unavailable",
+        "model_configured": model is not None,
+        "model_calls_in_flight": model_limiter.in_flight,
+        "max_in_flight": model_limiter.max_in_flight,
+        "queue_depth": model_limiter.waiting,
+        "max_queue": model_limiter.max_queue,
+        "requests_in_flight": requests_in_flight,
+    }, status_code=200 if ready else 503)
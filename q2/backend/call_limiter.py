@@ -0,0 +1,142 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+
+class Overloaded(Exception):
+    """Raised instead of queueing a call the server has no room for."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class LimiterStats:
+    completed: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+
+
+class CallLimiter:
+    """Run blocking model calls off the event loop, at most `max_in_flight` at a time.
+
+    Calls beyond the limit wait in a queue of at most `max_queue` entries for
+    up to `queue_timeout` seconds; anything past that fails fast with
+    `Overloaded` so requests don't pile up on a saturated worker.
+    `on_timing`, if given, is called with ("queue_wait", seconds) and
+    ("model_call", seconds) for every call.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 8,
+        max_queue: int = 32,
+        queue_timeout: Optional[float] = 30,
+        on_timing: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.on_timing = on_timing
+        self.in_flight = 0
+        self.waiting = 0
+        self.stats = LimiterStats()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        # A dedicated pool, so slow model calls can't starve the default
+        # executor that FastAPI and file uploads rely on
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="model-call")
+
+    @property
+    def saturated(self) -> bool:
+        # `waiting` goes up before the semaphore is awaited and turns into
+        # `in_flight` without yielding, so their sum counts every admitted
+        # call, including a burst that hasn't reached the semaphore yet
+        return self.in_flight + self.waiting >= self.max_in_flight + self.max_queue
+
+    def check_capacity(self):
+        """Fail before any work is done for a request that could only be rejected."""
+        if self.saturated:
+            self.stats.rejected += 1
+            raise Overloaded("Too many requests are waiting for the model; try again shortly")
+
+    def _report(self, stage: str, start: float):
+        if self.on_timing is not None:
+            self.on_timing(stage, time.perf_counter() - start)
+
+    async def _acquire(self):
+        self.check_capacity()
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats.timed_out += 1
+            raise Overloaded("Timed out waiting for a free model slot", retry_after=5)
+        finally:
+            self.waiting -= 1
+            self._report("queue_wait", start)
+        self.in_flight += 1
+
+    def _release(self):
+        self.in_flight -= 1
+        self.stats.completed += 1
+        self._semaphore.release()
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        await self._acquire()
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+        finally:
+            self._report("model_call", start)
+            self._release()
+
+    async def stream(self, make_iterator: Callable[..., Iterator], *args, **kwargs) -> AsyncIterator:
+        """Consume a blocking iterator (e.g. a streamed model response) in the pool.
+
+        Items are handed to the event loop as they arrive. The call holds one
+        slot until the iterator is exhausted or the consumer stops early.
+        """
+        await self._acquire()
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stopped = threading.Event()
+
+        def produce():
+            try:
+                for item in make_iterator(*args, **kwargs):
+                    if stopped.is_set():
+                        return
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+            except Exception as e:
+                if not stopped.is_set():
+                    loop.call_soon_threadsafe(queue.put_nowait, (finished, e))
+            else:
+                if not stopped.is_set():
+                    loop.call_soon_threadsafe(queue.put_nowait, (finished, None))
+
+        worker = loop.run_in_executor(self._executor, produce)
+        try:
+            while True:
+                item, error = await queue.get()
+                if error is not None:
+                    raise error
+                if item is finished:
+                    return
+                yield item
+        finally:
+            stopped.set()
+            self._report("model_call", start)
+            # Keep the slot until the worker thread has actually let go of it
+            worker.add_done_callback(lambda _: self._release())
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
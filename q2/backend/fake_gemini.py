@@ -0,0 +1,63 @@
+"""Offline stand-in for the Gemini GenerativeModel used by app.py.
+
+It mimics just enough of the SDK (generate_content with and without
+streaming, .text on responses and chunks) for the backend to run unchanged,
+with configurable latency and failure rate, so the service can be
+load-tested without API quota.
+"""
+import random
+import time
+from types import SimpleNamespace
+
+
+class FakeGeminiError(Exception):
+    """Raised by the fake model to simulate a failed Gemini call."""
+
+
+class FakeGeminiModel:
+    def __init__(
+        self,
+        first_token_ms: float = 400,
+        per_chunk_ms: float = 40,
+        chunks: int = 10,
+        error_rate: float = 0.0,
+        jitter: float = 0.1,
+    ):
+        self.first_token_ms = first_token_ms
+        self.per_chunk_ms = per_chunk_ms
+        self.chunks = chunks
+        self.error_rate = error_rate
+        self.jitter = jitter
+
+    def _sleep(self, milliseconds: float):
+        spread = milliseconds * self.jitter
+        time.sleep(max(0.0, milliseconds + random.uniform(-spread, spread)) / 1000)
+
+    def _pieces(self, contents: list) -> list[str]:
+        image = next((part for part in contents if isinstance(part, dict)), {})
+        question = next((part for part in contents if isinstance(part, str)), "")
+        summary = f"Simulated answer for a {len(image.get('data', b''))} byte {image.get('mime_type')} image. "
+        words = (summary + question).split()
+        per_chunk = max(1, len(words) // self.chunks)
+        return [" ".join(words[i:i + per_chunk]) + " " for i in range(0, len(words), per_chunk)]
+
+    def _maybe_fail(self):
+        if random.random() < self.error_rate:
+            raise FakeGeminiError("Simulated Gemini failure")
+
+    def generate_content(self, contents: list, stream: bool = False):
+        pieces = self._pieces(contents)
+        if stream:
+            return self._stream(pieces)
+
+        self._sleep(self.first_token_ms + self.per_chunk_ms * (len(pieces) - 1))
+        self._maybe_fail()
+        return SimpleNamespace(text="".join(pieces))
+
+    def _stream(self, pieces: list[str]):
+        self._sleep(self.first_token_ms)
+        self._maybe_fail()
+        for i, piece in enumerate(pieces):
+            if i:
+                self._sleep(self.per_chunk_ms)
+            yield SimpleNamespace(text=piece)
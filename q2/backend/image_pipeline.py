@@ -0,0 +1,143 @@
+import asyncio
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+# Formats we can re-encode to, with the MIME type Gemini expects for each
+MIME_TYPES = {
+    "WEBP": "image/webp",
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+}
+
+# Image.info keys that normalization strips
+METADATA_KEYS = ("exif", "icc_profile", "xmp", "comment")
+
+
+@dataclass
+class PreprocessedImage:
+    """A normalized image ready to send to the model, plus what it cost to make."""
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_bytes: int
+    seconds: float
+    dhash: int = 0
+
+    @property
+    def processed_bytes(self) -> int:
+        return len(self.data)
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+    def report(self) -> dict:
+        return {
+            "mime_type": self.mime_type,
+            "width": self.width,
+            "height": self.height,
+            "original_bytes": self.original_bytes,
+            "processed_bytes": self.processed_bytes,
+            "saved_bytes": self.saved_bytes,
+            "preprocess_ms": round(self.seconds * 1000, 1),
+        }
+
+
+# 16x16 gives a 256-bit hash; 8x8 collapses most documents and screenshots to the same value
+HASH_SIZE = 16
+
+
+def dhash(img: Image.Image, size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per pixel, set when it is brighter than its right neighbour.
+
+    Resized or re-encoded copies of an image hash to the same or nearby values.
+    """
+    small = img.convert("L").resize((size + 1, size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def normalize_image(data: bytes, max_side: int, fmt: str, quality: int) -> PreprocessedImage:
+    """Downsize, strip metadata from and re-encode an uploaded image.
+
+    An upload that needs neither a downscale nor a metadata strip is kept
+    as-is when re-encoding would not make it smaller. Runs in a worker
+    process, so it only takes and returns picklable values.
+    """
+    start = time.perf_counter()
+    img = Image.open(io.BytesIO(data))
+    source_format = img.format
+    needs_rewrite = max(img.size) > max_side or any(key in img.info for key in METADATA_KEYS)
+    # Let the JPEG decoder skip detail we are about to throw away
+    img.draft("RGB", (max_side, max_side))
+    # Apply the EXIF rotation before the metadata is dropped
+    img = ImageOps.exif_transpose(img)
+
+    keep_alpha = fmt != "JPEG" and (img.mode in ("RGBA", "LA") or "transparency" in img.info)
+    img = img.convert("RGBA" if keep_alpha else "RGB")
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    # Saving without exif/icc_profile/info arguments writes no metadata
+    out = io.BytesIO()
+    if fmt == "PNG":
+        img.save(out, format=fmt, optimize=True)
+    else:
+        img.save(out, format=fmt, quality=quality)
+
+    encoded, mime_type = out.getvalue(), MIME_TYPES[fmt]
+    if not needs_rewrite and source_format in MIME_TYPES and len(encoded) >= len(data):
+        encoded, mime_type = data, MIME_TYPES[source_format]
+
+    # Perceptual hash of the normalized image, for near-duplicate lookups
+    image_hash = dhash(img)
+    return PreprocessedImage(
+        data=encoded,
+        mime_type=mime_type,
+        width=img.width,
+        height=img.height,
+        original_bytes=len(data),
+        seconds=time.perf_counter() - start,
+        dhash=image_hash,
+    )
+
+
+class ImagePipeline:
+    """Normalize uploads in a process pool so PIL work never blocks the event loop."""
+
+    def __init__(self, max_side: int = 1536, fmt: str = "WEBP", quality: int = 85, workers: Optional[int] = None):
+        fmt = fmt.upper()
+        if fmt not in MIME_TYPES:
+            raise ValueError(f"Unsupported image format {fmt!r}; use one of {', '.join(MIME_TYPES)}")
+        self.max_side = max_side
+        self.fmt = fmt
+        self.quality = quality
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def process(self, data: bytes) -> PreprocessedImage:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._get_pool(), normalize_image, data, self.max_side, self.fmt, self.quality
+        )
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
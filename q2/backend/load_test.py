@@ -0,0 +1,323 @@
+"""Offline load test for the image analysis backend.
+
+Starts app.py in a separate process with a fake Gemini model (see
+fake_gemini.py), replays a corpus of images and questions against it at a
+fixed concurrency or request rate, and reports throughput, latency
+percentiles and the server's memory high-water mark.
+
+    python load_test.py --concurrency 16 --duration 30
+    python load_test.py --rps 20 --endpoint stream --error-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import mimetypes
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent
+DEFAULT_IMAGES = BACKEND_DIR.parent / "frontend" / "assets" / "sample-images"
+DEFAULT_QUESTIONS = [
+    "What is shown in this image?",
+    "Describe the layout of this screenshot.",
+    "What text can you read in the image?",
+    "Which colors dominate this image?",
+]
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".gif", ".bmp"}
+ENDPOINTS = {"analyze": "/analyze", "stream": "/analyze/stream"}
+
+
+def serve(args):
+    """Run the backend with the fake model; used as the load test's server process."""
+    import uvicorn
+
+    # Every request should exercise upload and preprocessing, not the answer cache
+    if not args.cache:
+        os.environ["ANSWER_CACHE_MAX_ENTRIES"] = "0"
+        os.environ["ANSWER_CACHE_PATH"] = ""
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    import app
+    from fake_gemini import FakeGeminiModel
+    from llm_client import GeminiModel
+
+    # Wrapped like the real model, so rate limits and retries are part of the test
+    app.model = GeminiModel(FakeGeminiModel(
+        first_token_ms=args.first_token_ms,
+        per_chunk_ms=args.per_chunk_ms,
+        chunks=args.chunks,
+        error_rate=args.error_rate,
+    ), "fake-gemini")
+    uvicorn.run(app.app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+def load_corpus(images_dir: Path, questions_file: Path = None) -> list[dict]:
+    """Pair every image in `images_dir` with every question."""
+    images = sorted(path for path in images_dir.iterdir() if path.suffix.lower() in IMAGE_SUFFIXES)
+    if not images:
+        raise SystemExit(f"No images found in {images_dir}")
+    questions = DEFAULT_QUESTIONS
+    if questions_file:
+        questions = [line.strip() for line in questions_file.read_text().splitlines() if line.strip()]
+
+    corpus = []
+    for path in images:
+        data = path.read_bytes()
+        mime_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        for question in questions:
+            corpus.append({"name": path.name, "data": data, "mime_type": mime_type, "question": question})
+    return corpus
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(args, port: int) -> subprocess.Popen:
+    command = [
+        sys.executable, str(Path(__file__).resolve()), "serve",
+        "--port", str(port),
+        "--first-token-ms", str(args.first_token_ms),
+        "--per-chunk-ms", str(args.per_chunk_ms),
+        "--chunks", str(args.chunks),
+        "--error-rate", str(args.error_rate),
+    ]
+    if args.cache:
+        command.append("--cache")
+    server = subprocess.Popen(command, cwd=BACKEND_DIR)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit("Server exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise SystemExit("Server did not become healthy within 60s")
+
+
+def process_tree(pid: int) -> list[int]:
+    """The pid and all of its descendants (Linux only)."""
+    pids = [pid]
+    for task in Path(f"/proc/{pid}/task").glob("*"):
+        try:
+            children = (task / "children").read_text().split()
+        except OSError:
+            continue
+        for child in children:
+            pids.extend(process_tree(int(child)))
+    return pids
+
+
+def status_kb(pid: int, field: str) -> int:
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class MemorySampler:
+    """Track the peak combined RSS of the server and its preprocessing workers."""
+
+    def __init__(self, pid: int, interval: float = 0.1):
+        self.pid = pid
+        self.interval = interval
+        self.peak_total_kb = 0
+
+    async def run(self):
+        while True:
+            total = sum(status_kb(pid, "VmRSS") for pid in process_tree(self.pid))
+            self.peak_total_kb = max(self.peak_total_kb, total)
+            await asyncio.sleep(self.interval)
+
+    def server_high_water_kb(self) -> int:
+        # The kernel's own peak RSS for the server process, between our samples too
+        return status_kb(self.pid, "VmHWM")
+
+
+async def send(client: httpx.AsyncClient, endpoint: str, item: dict) -> dict:
+    files = {"image": (item["name"], item["data"], item["mime_type"])}
+    data = {"question": item["question"]}
+    start = time.perf_counter()
+    ttft = None
+    try:
+        if endpoint == "stream":
+            ok = False
+            async with client.stream("POST", ENDPOINTS[endpoint], files=files, data=data) as response:
+                status = response.status_code
+                async for line in response.aiter_lines():
+                    if line == "event: chunk" and ttft is None:
+                        ttft = time.perf_counter() - start
+                    elif line == "event: done":
+                        ok = True
+                    elif line == "event: error":
+                        ok = False
+        else:
+            response = await client.post(ENDPOINTS[endpoint], files=files, data=data)
+            status = response.status_code
+            ok = status == 200 and response.json().get("success", False)
+    except httpx.HTTPError as e:
+        status, ok = type(e).__name__, False
+    return {"status": status, "ok": ok, "latency": time.perf_counter() - start, "ttft": ttft}
+
+
+async def closed_loop(client, endpoint, corpus, concurrency, deadline, max_requests) -> list[dict]:
+    """`concurrency` virtual users, each sending its next request as soon as the last returns."""
+    results = []
+    counter = iter(range(max_requests or sys.maxsize))
+
+    async def user():
+        for index in counter:
+            if time.monotonic() >= deadline:
+                return
+            results.append(await send(client, endpoint, corpus[index % len(corpus)]))
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return results
+
+
+async def open_loop(client, endpoint, corpus, rps, deadline, max_requests) -> list[dict]:
+    """Send requests at a fixed arrival rate, however long earlier ones take."""
+    tasks = []
+    start = time.monotonic()
+    index = 0
+    while time.monotonic() < deadline and (not max_requests or index < max_requests):
+        tasks.append(asyncio.create_task(send(client, endpoint, corpus[index % len(corpus)])))
+        index += 1
+        await asyncio.sleep(max(0.0, start + index / rps - time.monotonic()))
+    return list(await asyncio.gather(*tasks))
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile; `q` in [0, 100]."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, round(q / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(results: list[dict], elapsed: float, sampler: MemorySampler) -> dict:
+    latencies = [r["latency"] for r in results if r["ok"]]
+    ttfts = [r["ttft"] for r in results if r["ok"] and r["ttft"] is not None]
+    statuses = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+
+    summary = {
+        "requests": len(results),
+        "succeeded": len(latencies),
+        "failed": len(results) - len(latencies),
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            f"p{q}": round(percentile(latencies, q) * 1000, 1) for q in (50, 90, 95, 99)
+        },
+        "server_peak_rss_mb": round(sampler.server_high_water_kb() / 1024, 1),
+        "total_peak_rss_mb": round(sampler.peak_total_kb / 1024, 1),
+    }
+    if latencies:
+        summary["latency_ms"]["max"] = round(max(latencies) * 1000, 1)
+    if ttfts:
+        summary["ttft_ms"] = {f"p{q}": round(percentile(ttfts, q) * 1000, 1) for q in (50, 95, 99)}
+    return summary
+
+
+def print_summary(summary: dict):
+    print(f"\nRequests:   {summary['requests']} ({summary['succeeded']} ok, {summary['failed']} failed)")
+    print(f"Statuses:   {', '.join(f'{status}: {count}' for status, count in sorted(summary['statuses'].items()))}")
+    print(f"Throughput: {summary['throughput_rps']} req/s over {summary['elapsed_s']}s")
+    print("Latency:    " + ", ".join(f"{name} {value}ms" for name, value in summary["latency_ms"].items()))
+    if "ttft_ms" in summary:
+        print("TTFT:       " + ", ".join(f"{name} {value}ms" for name, value in summary["ttft_ms"].items()))
+    print(
+        f"Memory:     server peak RSS {summary['server_peak_rss_mb']} MB, "
+        f"server + preprocessing workers {summary['total_peak_rss_mb']} MB"
+    )
+
+
+async def run_load(args, port: int, server_pid: int) -> dict:
+    corpus = load_corpus(args.images, args.questions)
+    sampler = MemorySampler(server_pid)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout, limits=limits) as client:
+        # Spin up the preprocessing pool before anything is measured
+        for item in corpus[:args.warmup]:
+            await send(client, args.endpoint, item)
+
+        sampling = asyncio.create_task(sampler.run())
+        deadline = time.monotonic() + args.duration
+        start = time.perf_counter()
+        if args.rps:
+            results = await open_loop(client, args.endpoint, corpus, args.rps, deadline, args.requests)
+        else:
+            results = await closed_loop(client, args.endpoint, corpus, args.concurrency, deadline, args.requests)
+        elapsed = time.perf_counter() - start
+        sampling.cancel()
+    return summarize(results, elapsed, sampler)
+
+
+def add_fake_model_options(parser: argparse.ArgumentParser):
+    parser.add_argument("--first-token-ms", type=float, default=400, help="Fake Gemini latency to the first chunk")
+    parser.add_argument("--per-chunk-ms", type=float, default=40, help="Fake Gemini delay between streamed chunks")
+    parser.add_argument("--chunks", type=int, default=10, help="Chunks per fake answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake Gemini calls that fail")
+    parser.add_argument("--cache", action="store_true", help="Keep the answer cache enabled")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command")
+    serve_parser = subcommands.add_parser("serve", help="Run only the server with the fake model")
+    serve_parser.add_argument("--port", type=int, default=8000)
+    add_fake_model_options(serve_parser)
+
+    add_fake_model_options(parser)
+    parser.add_argument("--images", type=Path, default=DEFAULT_IMAGES, help="Directory of sample images")
+    parser.add_argument("--questions", type=Path, help="File with one question per line")
+    parser.add_argument("--endpoint", choices=list(ENDPOINTS), default="analyze")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent virtual users (closed loop)")
+    parser.add_argument("--rps", type=float, help="Target requests per second (open loop, overrides --concurrency)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to generate load for")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=4, help="Unmeasured requests sent first")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--json", type=Path, help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args)
+        return
+
+    port = free_port()
+    server = start_server(args, port)
+    try:
+        summary = asyncio.run(run_load(args, port, server.pid))
+    finally:
+        server.terminate()
+        server.wait()
+
+    print_summary(summary)
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from typing import Optional
+
+from fastapi import UploadFile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadRejected(Exception):
+    """An upload that is too large or isn't an image we can process."""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Identify an image format from its leading magic bytes."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:2] == b"BM":
+        return "image/bmp"
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1", b"avif"):
+        return "image/heif"
+    return None
+
+
+async def read_upload(upload: UploadFile, max_bytes: int, chunk_size: int = CHUNK_SIZE) -> bytearray:
+    """Read an uploaded image in chunks, enforcing `max_bytes` as it streams in.
+
+    Non-images are rejected from their first chunk, and oversize uploads as
+    soon as they pass the limit, so neither is ever held in memory whole.
+    When the size is known up front the buffer is allocated once and filled
+    in place.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadRejected(f"Image is larger than the {max_bytes} byte limit", 413)
+
+    buffer = bytearray(upload.size or 0)
+    view = memoryview(buffer)
+    length = 0
+    while True:
+        chunk = await upload.read(chunk_size)
+        if not chunk:
+            break
+        if length == 0 and sniff_image_type(chunk) is None:
+            raise UploadRejected("Upload is not a supported image format", 415)
+        if length + len(chunk) > max_bytes:
+            raise UploadRejected(f"Image is larger than the {max_bytes} byte limit", 413)
+        if length + len(chunk) <= len(buffer):
+            view[length:length + len(chunk)] = chunk
+        else:
+            view.release()
+            buffer[length:] = chunk
+            view = memoryview(buffer)
+        length += len(chunk)
+
+    view.release()
+    if length == 0:
+        raise UploadRejected("Upload is empty", 415)
+    del buffer[length:]
+    return buffer
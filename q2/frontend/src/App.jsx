@@ -2,7 +2,7 @@ import { useState } from 'react'
 import { ChakraProvider, Box, VStack, Heading, Text, Input, Button, Image, useToast, Textarea } from '@chakra-ui/react'
 import ReactMarkdown from 'react-markdown'
 import rehypeRaw from 'rehype-raw'
-import { analyzeImage } from './api'
+import { analyzeImageStream } from './api'
 import './markdown.css'
 
 function App() {
@@ -34,9 +34,12 @@ function App() {
     }
 
     setLoading(true)
+    setAnswer('')
     try {
-      const result = await analyzeImage(selectedImage, question)
-      setAnswer(result.answer)
+      // Render the answer as it streams in instead of waiting for all of it
+      const result = await analyzeImageStream(selectedImage, question, (text) => {
+        setAnswer((previous) => previous + text)
+      })
       if (result.fallback) {
         toast({
           title: 'Notice',
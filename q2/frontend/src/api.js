@@ -15,6 +15,82 @@ export const analyzeImage = async (image, question) => {
         });
         return response.data;
     } catch (error) {
-        throw new Error(error.response?.data?.detail || 'Failed to analyze image');
+        throw new Error(error.response?.data?.detail || error.response?.data?.answer || 'Failed to analyze image');
     }
-}; 
\ No newline at end of file
+}; 
+
+// Ask several questions about one image, or one question about each of several
+// images. Resolves with { results, success }; every result has its own success flag.
+export const analyzeImageBatch = async (images, questions) => {
+    const formData = new FormData();
+    images.forEach((image) => formData.append('images', image));
+    questions.forEach((question) => formData.append('questions', question));
+
+    try {
+        const response = await axios.post(`${API_URL}/analyze/batch`, formData, {
+            headers: {
+                'Content-Type': 'multipart/form-data',
+            },
+        });
+        return response.data;
+    } catch (error) {
+        throw new Error(error.response?.data?.detail || error.response?.data?.answer || 'Failed to analyze images');
+    }
+};
+
+// Parse one Server-Sent Events block ("event: ...\ndata: ...") into { event, data }
+const parseEvent = (block) => {
+    let event = 'message';
+    const data = [];
+    for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+        } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trim());
+        }
+    }
+    return { event, data: data.length ? JSON.parse(data.join('\n')) : null };
+};
+
+// Stream the answer from /analyze/stream, calling onChunk with each piece of text
+// as it arrives. Resolves with the final "done" payload.
+export const analyzeImageStream = async (image, question, onChunk) => {
+    const formData = new FormData();
+    formData.append('image', image);
+    formData.append('question', question);
+
+    const response = await fetch(`${API_URL}/analyze/stream`, {
+        method: 'POST',
+        body: formData,
+    });
+    if (!response.ok || !response.body) {
+        const body = await response.json().catch(() => ({}));
+        throw new Error(body.detail || body.answer || 'Failed to analyze image');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+        const { value, done } = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line; keep any partial event for the next read
+        const blocks = buffer.split('\n\n');
+        buffer = blocks.pop();
+        for (const block of blocks) {
+            const { event, data } = parseEvent(block);
+            if (event === 'chunk') {
+                onChunk(data.text);
+            } else if (event === 'error') {
+                throw new Error(data.message);
+            } else if (event === 'done') {
+                return data;
+            }
+        }
+    }
+    throw new Error('Stream ended before the answer was complete');
+};
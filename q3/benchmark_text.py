@@ -0,0 +1,95 @@
+"""
+Micro-benchmark of the text-metrics engine against the original
+character-by-character string tools.
+
+Usage:
+    python benchmark_text.py [--size-mb 8] [--repeat 3]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from tools.text_metrics import analyze_batch, analyze_file, text_metrics
+
+SAMPLE = (
+    "Multimodality lets a model reason over text, images and audio together. "
+    "Naïve façades, Ünïcödé and ελληνικά letters count too; digits like 42 and ½ don't.\n"
+)
+
+
+def count_vowels_reference(text):
+    vowels = 'aeiouAEIOU'
+    return sum(1 for char in text if char in vowels)
+
+
+def count_letters_reference(text):
+    return sum(1 for char in text if char.isalpha())
+
+
+def analyze_text_reference(text):
+    return {
+        'vowels': count_vowels_reference(text),
+        'letters': count_letters_reference(text),
+        'length': len(text)
+    }
+
+
+def best_of(repeat, function, *args):
+    """Return (fastest wall time, result) over `repeat` runs."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def report(name, seconds, megabytes, baseline=None):
+    speedup = f"  {baseline / seconds:6.1f}x" if baseline else ""
+    print(f"{name:<28} {seconds * 1000:9.1f} ms  {megabytes / seconds:8.1f} MB/s{speedup}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=float, default=8, help='approximate size of the test text')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the fastest is reported')
+    args = parser.parse_args()
+
+    text = SAMPLE * max(1, int(args.size_mb * 1024 * 1024 / len(SAMPLE.encode())))
+    ascii_text = text.encode('ascii', 'ignore').decode('ascii')
+    megabytes = len(text.encode()) / 1e6
+    print(f"Text: {megabytes:.1f} MB, {len(text):,} characters\n")
+
+    baseline, expected = best_of(args.repeat, analyze_text_reference, text)
+    report('reference analyze_text', baseline, megabytes)
+    seconds, result = best_of(args.repeat, lambda t: text_metrics(t).as_dict(), text)
+    assert result == expected, (result, expected)
+    report('text_metrics (mixed)', seconds, megabytes, baseline)
+
+    ascii_baseline, ascii_expected = best_of(args.repeat, analyze_text_reference, ascii_text)
+    seconds, result = best_of(args.repeat, lambda t: text_metrics(t).as_dict(), ascii_text)
+    assert result == ascii_expected, (result, ascii_expected)
+    report('text_metrics (ASCII)', seconds, len(ascii_text) / 1e6, ascii_baseline)
+
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', newline='', suffix='.txt', delete=False) as f:
+        f.write(text)
+    try:
+        seconds, result = best_of(args.repeat, lambda p: analyze_file(p).as_dict(), f.name)
+        assert result == expected, (result, expected)
+        report('analyze_file (mmap)', seconds, megabytes, baseline)
+    finally:
+        os.unlink(f.name)
+
+    texts = [SAMPLE * 4] * 20000
+    batch_megabytes = sum(len(t.encode()) for t in texts) / 1e6
+    batch_baseline, expected = best_of(args.repeat, lambda ts: [analyze_text_reference(t) for t in ts], texts)
+    report('reference, 20k short texts', batch_baseline, batch_megabytes)
+    seconds, result = best_of(args.repeat, analyze_batch, texts)
+    assert [metrics.as_dict() for metrics in result] == expected
+    report('analyze_batch, 20k texts', seconds, batch_megabytes, batch_baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Offline stand-in for the Gemini model used by main.py.
+
+It answers planning prompts with canned JSON plans and any other prompt
+with a fixed sentence, after a configurable delay, so the batch runner can
+be exercised from scripts and tests without an API key.
+"""
+
+import json
+import re
+import time
+from types import SimpleNamespace
+
+# The query line of a planning prompt built by create_prompt
+QUERY_LINE = re.compile(r'^Query: (.*)$', re.MULTILINE)
+
+EXAMPLE_PLANS = {
+    "What's the square root of the average of 18 and 50?": {
+        'understanding': 'Average 18 and 50, then take the square root',
+        'calls': [
+            {'id': 'c1', 'tool': 'calculate_average', 'args': {'numbers': [18, 50]}},
+            {'id': 'c2', 'tool': 'calculate_square_root', 'args': {'number': {'$ref': 'c1'}}}
+        ],
+        'answer_template': 'The square root of the average of 18 and 50 is {c2}'
+    },
+    "How many vowels are in the word 'Multimodality'?": {
+        'understanding': "Count the vowels in 'Multimodality'",
+        'calls': [{'id': 'c1', 'tool': 'count_vowels', 'args': {'text': 'Multimodality'}}],
+        'answer_template': "The word 'Multimodality' contains {c1} vowels"
+    },
+    "Is the number of letters in 'machine' greater than the number of vowels in 'reasoning'?": {
+        'understanding': "Count letters in 'machine' and vowels in 'reasoning', then compare",
+        'calls': [
+            {'id': 'c1', 'tool': 'count_letters', 'args': {'text': 'machine'}},
+            {'id': 'c2', 'tool': 'count_vowels', 'args': {'text': 'reasoning'}},
+            {'id': 'c3', 'tool': 'compare_numbers', 'args': {'a': {'$ref': 'c1'}, 'b': {'$ref': 'c2'}}}
+        ],
+        'answer_template': "'machine' has {c1} letters and 'reasoning' has {c2} vowels, and {c3}."
+    }
+}
+
+
+class FakeModel:
+    def __init__(self, plans=None, latency_ms=0, answer='This is a simulated answer.'):
+        self.plans = EXAMPLE_PLANS if plans is None else plans
+        self.latency_ms = latency_ms
+        self.answer = answer
+
+    def generate_content(self, prompt, generation_config=None):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        match = QUERY_LINE.search(prompt)
+        if not match:
+            return SimpleNamespace(text=self.answer)
+        query = match.group(1).strip()
+        plan = self.plans.get(query, {'understanding': query, 'calls': [], 'answer': self.answer})
+        return SimpleNamespace(text=json.dumps(plan))
@@ -1,138 +1,312 @@
 import os
-from dotenv import load_dotenv
-import google.generativeai as genai
-from tools.math_tools import calculate_average, calculate_square_root, compare_numbers
-from tools.string_tools import count_vowels, count_letters, analyze_text
+import re
+import json
+import time
+import argparse
+import threading
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+try:
+    from llm_client import GeminiModel, gemini_model, shared_client
+except ImportError:
+    # Not installed with `pip install -e .`; use the checkout's copy at the repository root
+    sys.path.append(str(Path(__file__).resolve().parent.parent))
+    from llm_client import GeminiModel, gemini_model, shared_client
+from dotenv import load_dotenv
+from tools import ToolCall, ToolExecutor, format_value, registry as tool_registry
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
+MODEL_NAME = os.getenv('GEMINI_MODEL', 'gemini-1.5-flash')
+# Seconds a successful health probe is trusted before it is repeated
+HEALTH_CHECK_TTL = float(os.getenv('HEALTH_CHECK_TTL', '300'))
 
-# Check if API key is available
-if not GOOGLE_API_KEY:
-    print("Error: GOOGLE_API_KEY not found in .env file")
-    print("Please make sure you have:")
-    print("1. Created a .env file in the project root")
-    print("2. Added your Gemini API key as: GOOGLE_API_KEY=your_api_key_here")
-    sys.exit(1)
+class ModelUnavailable(Exception):
+    """The Gemini client can't be created or failed its health probe."""
 
-try:
-    genai.configure(api_key=GOOGLE_API_KEY)
-    # Initialize the model
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    # Test the configuration with a simple generation
-    model.generate_content("Test")
-except Exception as e:
+_model = None
+_model_lock = threading.Lock()
+_last_health_check = None
+
+def set_model(model):
+    """Use `model` (anything with generate_content, e.g. fake_model.FakeModel) instead of Gemini."""
+    global _model, _last_health_check
+    with _model_lock:
+        _model = model
+        _last_health_check = None
+
+def get_model():
+    """Return the model, configuring the Gemini client on first use."""
+    global _model
+    with _model_lock:
+        if _model is None:
+            if not GOOGLE_API_KEY:
+                raise ModelUnavailable("GOOGLE_API_KEY not found in .env file")
+            # Timeouts, rate limits and retries come from the shared client (LLM_* variables)
+            _model = gemini_model(MODEL_NAME, GOOGLE_API_KEY)
+        return _model
+
+def check_model(force=False):
+    """Probe the model with a tiny request; a success is cached for HEALTH_CHECK_TTL seconds."""
+    global _last_health_check
+    if not force and _last_health_check and time.monotonic() - _last_health_check < HEALTH_CHECK_TTL:
+        return
+    try:
+        get_model().generate_content("Test")
+    except ModelUnavailable:
+        raise
+    except Exception as e:
+        raise ModelUnavailable(str(e)) from e
+    _last_health_check = time.monotonic()
+
+def print_setup_help(error):
     print("Error initializing Gemini API:")
-    print(str(e))
+    print(str(error))
     print("\nPlease make sure:")
-    print("1. Your API key is valid")
-    print("2. You have internet connectivity")
-    print("3. The API service is available")
-    sys.exit(1)
+    print("1. You created a .env file in the project root with GOOGLE_API_KEY=your_api_key_here")
+    print("2. Your API key is valid")
+    print("3. You have internet connectivity and the API service is available")
+
+# {c1}-style references to tool results in an answer template
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+# Runs independent tool calls of a plan concurrently
+tool_executor = ToolExecutor(tool_registry, max_workers=int(os.getenv('TOOL_WORKERS', '4')))
 
 def create_prompt(query):
-    return f"""Analyze the following query and determine which tools to use from our available toolset.
+    return f"""Analyze the following query and plan which tools from our toolset to call.
 
-Available tools:
-1. count_vowels(text): Counts the number of vowels in a text
-2. count_letters(text): Counts the number of letters in a text
-3. analyze_text(text): Returns vowels, letters, and length metrics
-4. calculate_average(*numbers): Calculates average of numbers
-5. calculate_square_root(number): Calculates square root
-6. compare_numbers(a, b): Compares two numbers
+Available tools (JSON schema):
+{json.dumps(tool_registry.schema(), indent=2)}
 
 Query: {query}
 
-You MUST use the following format in your response:
-UNDERSTANDING: Write a brief explanation of what the query is asking for.
-NEEDS_TOOLS: Write 'yes' if we need to use any tools, 'no' if not.
-TOOLS_REQUIRED: List the exact tool names needed, separated by commas (e.g., count_vowels, analyze_text)
-PARAMETERS: List the exact parameters to pass to each tool (e.g., devendra)
-EXECUTION_PLAN: List the steps to solve this query using the tools.
+Respond with a single JSON object and nothing else, in this shape:
+{{
+  "understanding": "a brief explanation of what the query is asking for",
+  "calls": [{{"id": "c1", "tool": "<tool name>", "args": {{"<parameter>": <value>}}}}],
+  "answer_template": "the final answer as a sentence, with {{c1}}-style placeholders for tool results",
+  "answer": "the final answer, only when no tools are needed"
+}}
 
-For text analysis queries, ALWAYS use our tools instead of explaining how to implement the logic.
-For math queries, ALWAYS use our calculator tools instead of explaining the math."""
+Rules:
+- For text analysis queries, ALWAYS use our tools instead of explaining how to implement the logic.
+- For math queries, ALWAYS use our calculator tools instead of explaining the math.
+- Pass text arguments exactly as they appear in the query, without surrounding quotes.
+- To use the result of an earlier call as an argument, pass {{"$ref": "<call id>"}} in place of the value,
+  e.g. {{"number": {{"$ref": "c1"}}}}. For analyze_text results, pick one metric with
+  {{"$ref": "c1", "field": "vowels"}}. Calls that don't refer to each other run in parallel.
+- Leave "calls" empty when no tools are needed.
+- Every placeholder in "answer_template" must be the id of a call.
+- "answer_template" must be a complete sentence that answers the question as asked, not just a placeholder;
+  for comparisons, state the compared values and the relationship, e.g.
+  "'machine' has {{c1}} letters and 'reasoning' has {{c2}} vowels, so {{c3}}."."""
+
+def extract_json(text):
+    """Return the JSON object in a model response, tolerating code fences and surrounding prose."""
+    start = text.find('{')
+    end = text.rfind('}')
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
 
 def parse_llm_response(response):
-    """Parse the LLM response to extract key information."""
-    text = response.text
-    
-    # Extract key information using simple text parsing
-    understanding = text.split('UNDERSTANDING:')[1].split('NEEDS_TOOLS:')[0].strip()
-    needs_tools = 'yes' in text.split('NEEDS_TOOLS:')[1].split('TOOLS_REQUIRED:')[0].strip().lower()
-    tools_required = text.split('TOOLS_REQUIRED:')[1].split('PARAMETERS:')[0].strip()
-    parameters = text.split('PARAMETERS:')[1].split('EXECUTION_PLAN:')[0].strip()
-    execution_plan = text.split('EXECUTION_PLAN:')[1].strip()
-    
+    """Parse the planning response into a plan. Never raises: bad output yields an empty plan with an error."""
+    try:
+        text = response.text
+    except ValueError as e:
+        # Blocked or empty responses have no text
+        text, error = '', str(e)
+    else:
+        error = None
+
+    data = extract_json(text)
+    if data is None:
+        return {
+            'understanding': '',
+            'calls': [],
+            'answer_template': None,
+            'answer': None,
+            'error': error or 'Planning response was not valid JSON'
+        }
+
+    calls = []
+    raw_calls = data.get('calls')
+    for i, call in enumerate(raw_calls if isinstance(raw_calls, list) else [], 1):
+        if not isinstance(call, dict) or not isinstance(call.get('tool'), str):
+            continue
+        calls.append({
+            'id': str(call.get('id') or f'c{i}'),
+            'tool': call['tool'].strip(),
+            'args': call.get('args') if isinstance(call.get('args'), dict) else {}
+        })
+
+    template = data.get('answer_template')
+    answer = data.get('answer')
     return {
-        'understanding': understanding,
-        'needs_tools': needs_tools,
-        'tools_required': [t.strip() for t in tools_required.split(',') if t.strip()],
-        'parameters': parameters,
-        'execution_plan': execution_plan
+        'understanding': str(data.get('understanding') or ''),
+        'calls': calls,
+        'answer_template': template if isinstance(template, str) and template.strip() else None,
+        'answer': answer if isinstance(answer, str) and answer.strip() else None,
+        'error': None
     }
 
-def execute_tool_call(tool_name, parameters):
-    """Execute the appropriate tool based on the tool name and parameters."""
-    # Clean parameters string and extract values
-    params = [p.strip() for p in parameters.split(',')]
-    
-    if tool_name == 'calculate_average':
-        numbers = [float(n) for n in params]
-        return calculate_average(*numbers)
-    elif tool_name == 'calculate_square_root':
-        return calculate_square_root(float(params[0]))
-    elif tool_name == 'count_vowels':
-        return count_vowels(params[0])
-    elif tool_name == 'count_letters':
-        return count_letters(params[0])
-    elif tool_name == 'compare_numbers':
-        return compare_numbers(float(params[0]), float(params[1]))
-    elif tool_name == 'analyze_text':
-        return analyze_text(params[0])
-    else:
-        raise ValueError(f"Unknown tool: {tool_name}")
+def execute_tool_call(tool_name, args):
+    """Execute a tool with named arguments, validated against its schema."""
+    return tool_registry.call(tool_name, args)
+
+def execute_plan(calls):
+    """Run the planned calls, resolving $ref arguments, and return the execution report."""
+    return tool_executor.run([ToolCall(call['id'], call['tool'], call['args']) for call in calls])
+
+def format_answer(template, results):
+    """Fill a placeholder template with tool results, or return None if it doesn't fit them."""
+    missing = []
+
+    def substitute(match):
+        call_id = match.group(1)
+        if call_id not in results:
+            missing.append(call_id)
+            return match.group(0)
+        return format_value(results[call_id])
+
+    answer = PLACEHOLDER.sub(substitute, template)
+    return None if missing else answer
+
+def _quiet(*args, **kwargs):
+    pass
+
+def process_query(query, model=None, verbose=True):
+    """Process a natural language query using the LLM and tools.
+
+    The planning call returns the tool calls and an answer template, so
+    queries whose tools all succeed are answered in a single model call;
+    the model is only asked again to explain failures or unplanned results.
+    With verbose=False nothing is printed, for batch runs.
+    """
+    log = print if verbose else _quiet
+    model = model or get_model()
+    timings = {}
+    log(f"\nProcessing query: {query}")
+    log("-" * 50)
 
-def process_query(query):
-    """Process a natural language query using the LLM and tools."""
-    print(f"\nProcessing query: {query}")
-    print("-" * 50)
-    
     # Get LLM's reasoning
-    response = model.generate_content(create_prompt(query))
-    parsed_response = parse_llm_response(response)
-    
-    print("\nReasoning:")
-    print(parsed_response['understanding'])
-    print("\nExecution Plan:")
-    print(parsed_response['execution_plan'])
-    
+    start = time.perf_counter()
+    response = model.generate_content(
+        create_prompt(query),
+        generation_config={"response_mime_type": "application/json"}
+    )
+    timings['planning'] = time.perf_counter() - start
+    model_calls = 1
+    plan = parse_llm_response(response)
+
+    if plan['error']:
+        log(f"\nCould not parse the plan: {plan['error']}")
+    else:
+        log("\nReasoning:")
+        log(plan['understanding'])
+
     # Execute tools if needed
-    if parsed_response['needs_tools']:
-        print("\nUsing tools:", ", ".join(parsed_response['tools_required']))
-        results = []
-        for tool in parsed_response['tools_required']:
-            result = execute_tool_call(tool, parsed_response['parameters'])
-            results.append(result)
-            print(f"Tool {tool} result:", result)
+    results, errors, tool_seconds, outcomes = {}, {}, {}, []
+    start = time.perf_counter()
+    if plan['calls']:
+        log("\nUsing tools:", ", ".join(call['tool'] for call in plan['calls']))
+        report = execute_plan(plan['calls'])
+        outcomes = report.ordered
+        for position, (call, outcome) in enumerate(zip(plan['calls'], outcomes), 1):
+            if any(outcome is rejected for rejected in report.rejected):
+                # The id keeps the first call's result; the repeat is a plan error
+                errors[f"{call['id']}#{position}"] = outcome.error
+                log(f"Tool {call['tool']} failed:", outcome.error)
+            elif outcome.error:
+                errors[call['id']] = outcome.error
+                log(f"Tool {call['tool']} failed:", outcome.error)
+            else:
+                results[call['id']] = outcome.result
+                note = " (reused)" if outcome.cached else f" ({outcome.seconds * 1000:.2f} ms)"
+                log(f"Tool {call['tool']}({outcome.args}) result:", outcome.result, note)
+        tool_seconds = report.tool_seconds()
+        log(f"Tools finished in {report.seconds * 1000:.2f} ms")
     else:
-        print("\nNo tools needed.")
-        results = []
-    
-    # Get final answer from LLM
-    final_prompt = f"""Based on the original query: {query}
+        log("\nNo tools needed.")
+    timings['tools'] = time.perf_counter() - start
+
+    # Format the answer locally when the plan allows it
+    answer = None
+    if not plan['error'] and not errors:
+        if plan['calls'] and plan['answer_template']:
+            answer = format_answer(plan['answer_template'], results)
+        elif not plan['calls']:
+            answer = plan['answer']
+
+    if answer is None:
+        # Get final answer from LLM
+        final_prompt = f"""Based on the original query: {query}
     And the tool results: {results}
+    And the tool errors: {errors}
     Provide a clear and concise final answer."""
-    
-    final_response = model.generate_content(final_prompt)
-    print("\nFinal Answer:")
-    print(final_response.text)
+        start = time.perf_counter()
+        answer = model.generate_content(final_prompt).text
+        timings['final_answer'] = time.perf_counter() - start
+        model_calls += 1
 
-def main():
+    log("\nFinal Answer:")
+    log(answer)
+    log(f"\n(model calls: {model_calls})")
+    return {
+        'query': query,
+        'understanding': plan['understanding'],
+        'calls': [
+            {**call, 'result': outcome.result, 'error': outcome.error}
+            for call, outcome in zip(plan['calls'], outcomes)
+        ],
+        'answer': answer,
+        'model_calls': model_calls,
+        'tool_seconds': tool_seconds,
+        'timings': timings
+    }
+
+def read_queries(source):
+    """Queries from a file object, one per line; blank lines and # comments are skipped."""
+    for line in source:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+def run_batch(queries, output, workers=4, model=None):
+    """Answer `queries` on a bounded pool of threads and write one JSON line per query to `output`.
+
+    Lines are written as queries finish, so they carry the query's input
+    position in "index". Returns the number of failed queries.
+    """
+    if workers < 1:
+        raise ValueError(f"workers must be at least 1, got {workers}")
+    model = model or get_model()
+    failures = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(process_query, query, model, False): (index, query)
+            for index, query in enumerate(queries)
+        }
+        for future in as_completed(futures):
+            index, query = futures[future]
+            try:
+                record = {'index': index, **future.result(), 'error': None}
+            except Exception as e:
+                failures += 1
+                record = {'index': index, 'query': query, 'error': str(e)}
+            output.write(json.dumps(record, default=str) + '\n')
+            output.flush()
+    return failures
+
+def interactive():
     # Example queries
     example_queries = [
         "What's the square root of the average of 18 and 50?",
@@ -167,5 +341,50 @@ def main():
         else:
             print("\nInvalid choice. Please try again.")
 
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(description="Tool-Enhanced Reasoning System")
+    parser.add_argument('--batch', metavar='FILE',
+                        help="answer the queries in FILE (one per line, '-' for stdin) and print JSON lines")
+    parser.add_argument('--workers', type=positive_int, default=4, help="queries answered at once in batch mode")
+    parser.add_argument('--output', metavar='FILE', help="write batch results to FILE instead of stdout")
+    parser.add_argument('--check', action='store_true', help="probe the model before starting")
+    parser.add_argument('--fake', action='store_true', help="use the offline fake model instead of Gemini")
+    args = parser.parse_args()
+
+    if args.fake:
+        from fake_model import FakeModel
+        set_model(GeminiModel(FakeModel(), 'fake-gemini'))
+    try:
+        if args.check:
+            check_model()
+        else:
+            get_model()
+    except ModelUnavailable as e:
+        print_setup_help(e)
+        sys.exit(1)
+
+    if not args.batch:
+        interactive()
+        return
+
+    source = sys.stdin if args.batch == '-' else open(args.batch, encoding='utf-8')
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        failures = run_batch(list(read_queries(source)), output, workers=args.workers)
+        # Per-model call statistics go to stderr so stdout stays valid JSONL
+        print(json.dumps({'model_stats': shared_client().stats()}), file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    sys.exit(1 if failures else 0)
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -4,7 +4,10 @@ This package contains mathematical and string manipulation tools.
 """
 
 from .math_tools import calculate_average, calculate_square_root, compare_numbers
-from .string_tools import count_vowels, count_letters, analyze_text
+from .string_tools import count_vowels, count_letters, analyze_text, analyze_text_file
+from .text_metrics import TextMetrics, text_metrics, analyze_chunks, analyze_file, analyze_source, analyze_batch
+from .registry import ToolError, ToolRegistry, ToolSpec, Param, registry, format_value
+from .executor import ToolCall, CallResult, ExecutionReport, ToolExecutor
 
 __all__ = [
     'calculate_average',
@@ -12,5 +15,22 @@ __all__ = [
     'compare_numbers',
     'count_vowels',
     'count_letters',
-    'analyze_text'
+    'analyze_text',
+    'analyze_text_file',
+    'TextMetrics',
+    'text_metrics',
+    'analyze_chunks',
+    'analyze_file',
+    'analyze_source',
+    'analyze_batch',
+    'ToolError',
+    'ToolRegistry',
+    'ToolSpec',
+    'Param',
+    'registry',
+    'format_value',
+    'ToolCall',
+    'CallResult',
+    'ExecutionReport',
+    'ToolExecutor'
 ] 
\ No newline at end of file
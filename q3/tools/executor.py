@@ -0,0 +1,177 @@
+"""
+Runs a plan of tool calls as a dependency graph.
+
+A call's arguments may reference an earlier call's result with
+{"$ref": "<call id>"}, optionally picking one entry of a dict result with
+{"$ref": "<call id>", "field": "<key>"}. Calls whose dependencies are done
+run concurrently, identical calls within a plan run once, and every call is
+timed.
+"""
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from .registry import ToolError
+
+
+@dataclass
+class ToolCall:
+    id: str
+    tool: str
+    args: dict
+
+
+@dataclass
+class CallResult:
+    id: str
+    tool: str
+    args: Any = None
+    result: Any = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+    cached: bool = False
+
+
+@dataclass
+class ExecutionReport:
+    results: dict = field(default_factory=dict)     # call id -> CallResult
+    rejected: list = field(default_factory=list)    # CallResults of calls repeating an earlier id
+    ordered: list = field(default_factory=list)     # CallResult of every call, in plan order
+    seconds: float = 0.0
+
+    def tool_seconds(self):
+        """Total time spent in each tool, excluding reused results."""
+        totals = {}
+        for result in self.results.values():
+            if not result.cached:
+                totals[result.tool] = totals.get(result.tool, 0.0) + result.seconds
+        return totals
+
+
+def find_refs(value):
+    """Ids of the calls that an argument value refers to."""
+    if isinstance(value, dict):
+        if "$ref" in value:
+            return {str(value["$ref"])}
+        return set().union(*(find_refs(item) for item in value.values())) if value else set()
+    if isinstance(value, list):
+        return set().union(*(find_refs(item) for item in value)) if value else set()
+    return set()
+
+
+def resolve_refs(value, results):
+    """Replace references in an argument value with the referenced results."""
+    if isinstance(value, dict):
+        if "$ref" in value:
+            result = results[str(value["$ref"])].result
+            if "field" in value:
+                if not isinstance(value["field"], str):
+                    raise ToolError(f"Reference to {value['$ref']} has a non-string field {value['field']!r}")
+                if not isinstance(result, dict) or value["field"] not in result:
+                    raise ToolError(f"Result of {value['$ref']} has no field '{value['field']}'")
+                return result[value["field"]]
+            return result
+        return {key: resolve_refs(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_refs(item, results) for item in value]
+    return value
+
+
+class ToolExecutor:
+    """Execute tool calls from `registry` in dependency order, in parallel where possible."""
+
+    def __init__(self, registry, max_workers=4):
+        self.registry = registry
+        self.max_workers = max_workers
+
+    def _timed_call(self, tool, args):
+        start = time.perf_counter()
+        try:
+            value, error = self.registry.call(tool, args), None
+        except (ToolError, ValueError, TypeError, ArithmeticError, OSError) as e:
+            value, error = None, str(e)
+        return value, error, time.perf_counter() - start
+
+    def run(self, calls):
+        """Run `calls` (a list of ToolCall) and return an ExecutionReport."""
+        start = time.perf_counter()
+        report = ExecutionReport()
+        results = report.results
+        pending = {}
+        deps = {}
+        # The first call with an id runs; later ones are reported but never
+        # enter `results`, so references to the id always mean the first call
+        duplicates = {}
+        for index, call in enumerate(calls):
+            if call.id in pending:
+                duplicates[index] = CallResult(call.id, call.tool, call.args, error=f"Duplicate call id {call.id}")
+                continue
+            pending[call.id] = call
+            deps[call.id] = find_refs(call.args)
+
+        known = set(pending)
+        for call_id in list(pending):
+            unknown = deps[call_id] - known
+            if unknown:
+                call = pending.pop(call_id)
+                results[call_id] = CallResult(
+                    call_id, call.tool, call.args, error=f"Refers to unknown call {sorted(unknown)[0]}"
+                )
+
+        memo = {}      # (tool, args) -> future, so identical calls run once
+        waiters = {}   # future -> [(call id, tool, args, cached)]
+
+        def record(call_id, tool, args, outcome, cached):
+            value, error, seconds = outcome
+            results[call_id] = CallResult(call_id, tool, args, value, error, 0.0 if cached else seconds, cached)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while True:
+                progressed = True
+                while progressed:
+                    progressed = False
+                    for call_id in list(pending):
+                        if not deps[call_id] <= set(results):
+                            continue
+                        call = pending.pop(call_id)
+                        progressed = True
+                        failed = sorted(dep for dep in deps[call_id] if results[dep].error)
+                        if failed:
+                            results[call_id] = CallResult(
+                                call_id, call.tool, call.args, error=f"Depends on failed call {failed[0]}"
+                            )
+                            continue
+                        try:
+                            args = resolve_refs(call.args, results)
+                        except ToolError as e:
+                            results[call_id] = CallResult(call_id, call.tool, call.args, error=str(e))
+                            continue
+
+                        key = (call.tool, json.dumps(args, sort_keys=True, default=str))
+                        cached = key in memo
+                        if not cached:
+                            memo[key] = pool.submit(self._timed_call, call.tool, args)
+                        future = memo[key]
+                        if future.done() and future not in waiters:
+                            record(call_id, call.tool, args, future.result(), cached)
+                        else:
+                            waiters.setdefault(future, []).append((call_id, call.tool, args, cached))
+
+                if not waiters:
+                    break
+                done, _ = wait(list(waiters), return_when=FIRST_COMPLETED)
+                for future in done:
+                    for call_id, tool, args, cached in waiters.pop(future):
+                        record(call_id, tool, args, future.result(), cached)
+
+        # Whatever is left waits on itself through a cycle
+        for call_id, call in pending.items():
+            results[call_id] = CallResult(call_id, call.tool, call.args, error="Circular reference between calls")
+
+        report.rejected = list(duplicates.values())
+        report.ordered = [duplicates.get(index) or results[call.id] for index, call in enumerate(calls)]
+        report.seconds = time.perf_counter() - start
+        return report
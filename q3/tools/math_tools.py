@@ -8,11 +8,18 @@ def calculate_square_root(number):
     """Calculate the square root of a number."""
     return math.sqrt(number)
 
+def _format_number(number):
+    """Show whole numbers without a trailing .0, as counts usually are."""
+    if isinstance(number, float) and number.is_integer():
+        return str(int(number))
+    return f"{number:g}" if isinstance(number, float) else str(number)
+
 def compare_numbers(a, b):
     """Compare two numbers and return the relationship."""
+    a_text, b_text = _format_number(a), _format_number(b)
     if a > b:
-        return f"{a} is greater than {b}"
+        return f"{a_text} is greater than {b_text}"
     elif a < b:
-        return f"{a} is less than {b}"
+        return f"{a_text} is less than {b_text}"
     else:
-        return f"{a} is equal to {b}" 
\ No newline at end of file
+        return f"{a_text} is equal to {b_text}" 
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Typed descriptions of the tools, used both to show the model what it can
+call and to validate and coerce the arguments it sends back.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .math_tools import calculate_average, calculate_square_root, compare_numbers
+from .string_tools import count_vowels, count_letters, analyze_text, analyze_text_file
+
+
+class ToolError(Exception):
+    """A tool call that names an unknown tool or has invalid arguments."""
+
+
+@dataclass
+class Param:
+    name: str
+    type: str  # "string", "number" or "number[]"
+    description: str
+
+
+@dataclass
+class ToolSpec:
+    name: str
+    description: str
+    params: list
+    function: Callable
+
+    def schema(self):
+        """JSON-schema style description of the tool for the prompt."""
+        properties = {}
+        for param in self.params:
+            if param.type == "number[]":
+                properties[param.name] = {
+                    "type": "array", "items": {"type": "number"}, "description": param.description
+                }
+            else:
+                properties[param.name] = {"type": param.type, "description": param.description}
+        return {
+            "name": self.name,
+            "description": self.description,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": [param.name for param in self.params],
+            },
+        }
+
+
+def coerce(value, type_name):
+    """Convert a model-supplied argument to the declared parameter type."""
+    try:
+        if type_name == "string":
+            if isinstance(value, (dict, list)):
+                raise ToolError(f"expected text, got {value!r}")
+            return str(value)
+        if type_name == "number":
+            if isinstance(value, bool):
+                raise ToolError(f"expected a number, got {value!r}")
+            return float(value)
+        if type_name == "number[]":
+            # Accept "18, 50" as well as [18, 50]
+            if isinstance(value, str):
+                value = [part for part in value.split(",") if part.strip()]
+            if not isinstance(value, (list, tuple)):
+                value = [value]
+            return [coerce(item, "number") for item in value]
+    except (TypeError, ValueError):
+        raise ToolError(f"expected {type_name}, got {value!r}")
+    raise ToolError(f"unsupported parameter type {type_name}")
+
+
+class ToolRegistry:
+    """Tools by name, with their parameter schemas."""
+
+    def __init__(self):
+        self._tools = {}
+
+    def register(self, spec):
+        self._tools[spec.name] = spec
+        return spec
+
+    def __contains__(self, name):
+        return name in self._tools
+
+    def get(self, name):
+        if name not in self._tools:
+            raise ToolError(f"Unknown tool: {name}")
+        return self._tools[name]
+
+    def names(self):
+        return list(self._tools)
+
+    def schema(self):
+        return [spec.schema() for spec in self._tools.values()]
+
+    def call(self, name, args):
+        """Validate `args` against the tool's parameters and run it."""
+        spec = self.get(name)
+        if not isinstance(args, dict):
+            raise ToolError(f"{name} expects named arguments, got {args!r}")
+        positional = []
+        for param in spec.params:
+            if param.name not in args:
+                raise ToolError(f"{name} is missing argument '{param.name}'")
+            value = coerce(args[param.name], param.type)
+            if param.type == "number[]":
+                if not value:
+                    raise ToolError(f"{name} needs at least one number in '{param.name}'")
+                positional.extend(value)
+            else:
+                positional.append(value)
+        return spec.function(*positional)
+
+
+registry = ToolRegistry()
+registry.register(ToolSpec(
+    "count_vowels", "Counts the number of vowels in a text",
+    [Param("text", "string", "Text to count vowels in")], count_vowels,
+))
+registry.register(ToolSpec(
+    "count_letters", "Counts the number of letters in a text",
+    [Param("text", "string", "Text to count letters in")], count_letters,
+))
+registry.register(ToolSpec(
+    "analyze_text", "Returns vowels, letters, and length metrics of a text",
+    [Param("text", "string", "Text to analyze")], analyze_text,
+))
+registry.register(ToolSpec(
+    "analyze_text_file", "Returns vowels, letters, and length metrics of a UTF-8 text file",
+    [Param("path", "string", "Path of the file to analyze, relative to the allowed documents folder")], analyze_text_file,
+))
+registry.register(ToolSpec(
+    "calculate_average", "Calculates the average of numbers",
+    [Param("numbers", "number[]", "Numbers to average")], calculate_average,
+))
+registry.register(ToolSpec(
+    "calculate_square_root", "Calculates the square root of a number",
+    [Param("number", "number", "Non-negative number")], calculate_square_root,
+))
+registry.register(ToolSpec(
+    "compare_numbers", "Compares two numbers and describes their relationship",
+    [Param("a", "number", "First number"), Param("b", "number", "Second number")], compare_numbers,
+))
+
+
+def format_value(value: Any) -> str:
+    """Render a tool result for a human-readable answer."""
+    if isinstance(value, bool):
+        return str(value)
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else f"{round(value, 4):g}"
+    if isinstance(value, dict):
+        return ", ".join(f"{key}: {format_value(item)}" for key, item in value.items())
+    return str(value)
@@ -1,16 +1,36 @@
+import os
+from pathlib import Path
+
+from .text_metrics import analyze_file, text_metrics
+
+def resolve_tool_path(path):
+    """Resolve a model-supplied path, refusing anything outside TEXT_TOOL_ROOT.
+
+    File analysis is off unless TEXT_TOOL_ROOT names a directory, since the
+    path comes from the model (and so from whatever text it was shown).
+    """
+    root = os.getenv('TEXT_TOOL_ROOT')
+    if not root:
+        raise PermissionError("File analysis is disabled; set TEXT_TOOL_ROOT to allow it")
+    root = Path(root).resolve()
+    # Relative paths are taken from the root; symlinks are followed before checking
+    target = (root / path).resolve()
+    if not target.is_relative_to(root):
+        raise PermissionError(f"{path} is outside TEXT_TOOL_ROOT")
+    return target
+
 def count_vowels(text):
     """Count the number of vowels in a text."""
-    vowels = 'aeiouAEIOU'
-    return sum(1 for char in text if char in vowels)
+    return text_metrics(text).vowels
 
 def count_letters(text):
     """Count the number of letters in a text."""
-    return sum(1 for char in text if char.isalpha())
+    return text_metrics(text).letters
 
 def analyze_text(text):
     """Analyze text and return various metrics."""
-    return {
-        'vowels': count_vowels(text),
-        'letters': count_letters(text),
-        'length': len(text)
-    } 
\ No newline at end of file
+    return text_metrics(text).as_dict()
+
+def analyze_text_file(path):
+    """Analyze a UTF-8 text file under TEXT_TOOL_ROOT and return the same metrics as analyze_text."""
+    return analyze_file(resolve_tool_path(path)).as_dict()
\ No newline at end of file